@@ -0,0 +1,350 @@
+#! /usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+ASTI SOLAR RADIATION DATA DOWNLOAD, COMPILE, AND CONVERT TOOL
+-------
+A Collection of Python scripts that downloads daily measurements from
+weather measurment stations (WMS) from the Philippine E-Science Grid
+repository <http://repo.pscigrid.gov.ph/predict>, compiles and averages
+them to monthly average values, and saves the result into a shapefile.
+
+NB:
+The Tool has only been tested for *buntu (Linux) and Python 2.7.x
+The requirements/modules are found in the included requirements.txt
+The Tool is provided under the GNU General Public License v3.0
+
+Copyright (C) 2016 Ben Hur S. Pintor (bhs.pintor@gmail.com)
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <http://www.gnu.org/licenses/>.
+-------
+
+INSTRUCTIONS FOR RUNNING
+1. Open terminal (CTRL+ALT+T in Ubuntu).
+2. Go to asti-solar-dcc-tool directory.
+3. Type python dcc_bench.py [benchmark ...]
+
+N.B.
+Make sure that the modules found in requirements.txt are installed/present
+in the computer.
+If not, try installing them by typing on your terminal:
+    pip install -r requirements.text
+
+"""
+
+'''
+dcc_bench.py
+benchmarks for the Tool
+'''
+
+__author__ = "Ben Hur S. Pintor"
+__contact__ = "bhs.pintor<at>gmail.com"
+__version__ = "0.0.1"
+
+import csv
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import timeit
+from datetime import date
+
+import numpy as np
+
+sys.dont_write_bytecode = True
+
+import dcc_compile
+import dcc_convert
+import dcc_download
+import dcc_mockrepo
+import dcc_store
+
+
+def bench_listing(sensors=500, repeat=20):
+    """
+    Times parsing a day index page of the given number of sensors with
+    BeautifulSoup (the previous get_links/get_sensors) and with the
+    regex scanner of dcc_download.
+    """
+
+    names = ["%s_%i_20160301.csv" %(("BSWM_LUFFT", "ARG_FIELD", "AWS")[n % 3], n)
+             for n in range(sensors)]
+    html = dcc_mockrepo.make_index("/predict/2016/03/01/", names)
+    sensor = "BSWM_LUFFT"
+
+    def regex_links():
+        return dcc_download.extract_links(html)
+
+    def regex_sensors():
+        match = dcc_download.sensor_filter(sensor).search
+        return [link for link in dcc_download.extract_links(html) if match(link)]
+
+    timings = [("regex links", regex_links), ("regex sensors", regex_sensors)]
+
+    try:
+        import re
+        from bs4 import BeautifulSoup
+
+        def soup_links():
+            soup = BeautifulSoup(html, "html.parser")
+            return [link.get('href') for link in soup.find_all('a')]
+
+        def soup_sensors():
+            soup = BeautifulSoup(html, "html.parser")
+            return [link.get('href') for link in soup.find_all(href=re.compile(sensor))]
+
+        assert soup_links() == regex_links()
+        assert soup_sensors() == regex_sensors()
+        timings = [("soup links", soup_links), ("soup sensors", soup_sensors)] + timings
+
+    except ImportError:
+        print ("bs4 not installed, timing the regex scanner only")
+
+    print ("Index page with %i sensors (%i bytes), best of %i runs:"
+           %(sensors, len(html), repeat))
+    for name, func in timings:
+        best = min(timeit.repeat(func, number=1, repeat=repeat))
+        print ("  %-14s %9.3f ms" %(name, best * 1000))
+
+
+def bench_download(days=31, sensors=20, latency=0.02, interval=10,
+                   workers=(1, 4, 8, 16)):
+    """
+    Downloads a month of all-sensor data from a local MockRepository that
+    adds latency seconds to every request, once per worker count (and with
+    the asyncio engine if it can run), and reports files/s, bytes/s and the
+    cost of the listings at each level.
+    """
+
+    repo = dcc_mockrepo.MockRepository([2016], [3], sensors, interval, latency)
+    server = dcc_mockrepo.serve(repo)
+    url, cwd, stdout = dcc_download.ASTI_URL, os.getcwd(), sys.stdout
+    dcc_download.ASTI_URL = server.url
+
+    runs = [('threads', n) for n in workers]
+    try:
+        import dcc_download_async
+        runs.append(('async', dcc_download.MAX_IN_FLIGHT))
+    except (ImportError, SyntaxError):
+        pass
+
+    print ("%i sensors x %i days, %i-minute readings, %.0f ms latency"
+           %(sensors, days, interval, latency * 1000))
+    try:
+        for engine, n in runs:
+            saveDir = tempfile.mkdtemp()
+            stats = dcc_download.DownloadStats()
+            cache = dcc_download.ListingCache(os.path.join(saveDir, "listings.json"))
+            os.chdir(saveDir)
+            sys.stdout = open(os.devnull, 'w')
+            try:
+                dcc_download.download_range(date(2016, 3, 1), date(2016, 3, days), [],
+                                            workers=n, maxInFlight=max(n, 4) * 4,
+                                            cache=cache, engine=engine, stats=stats)
+            finally:
+                sys.stdout.close()
+                sys.stdout = stdout
+                os.chdir(cwd)
+                shutil.rmtree(saveDir)
+            print ("\n%s engine, %i workers:" %(engine, n))
+            print ("  " + stats.report().replace("\n", "\n  "))
+    finally:
+        dcc_download.ASTI_URL = url
+        server.shutdown()
+
+
+def row_parse(path, se):
+    """The daily file reader of compile_data before the two-phase reader."""
+
+    headers = {}
+    name = os.path.basename(path)
+    stamps = []
+    readings = []
+
+    with dcc_store.open_daily(path) as csvfile:
+        for row in csv.reader(csvfile, delimiter=","):
+            if len(row) < 3:
+                headers[row[0].split(':')[0]] = row[0].split(':')[1][1:]
+
+            headers['year'] = str(name[-12:-8])
+            headers['month'] = str(name[-8:-6])
+            headers['day'] = str(name[-6:-4])
+
+            if len(row) > 3 and row[0] != dcc_compile.DATA_HEADER:
+                if row[se] != 'None':
+                    stamps.append(row[0])
+                    readings.append(row[se])
+
+    return (headers, np.array(stamps, dtype='datetime64[s]'),
+            np.array(readings, dtype=float))
+
+
+def bench_parse(intervals=(1, 5, 10), repeat=20, se=7):
+    """
+    Times reading one daily file per reading interval with the per-row
+    reader compile_data used before and with dcc_compile.read_daily.
+    """
+
+    saveDir = tempfile.mkdtemp()
+    try:
+        print ("Daily file parse time, best of %i runs:" %repeat)
+        for interval in intervals:
+            path = os.path.join(saveDir, "BSWM_LUFFT_000_20160301.csv")
+            with open(path, 'wb') as outfile:
+                outfile.write(dcc_mockrepo.make_daily("BSWM_LUFFT_000", 2016, 3, 1, interval))
+
+            before = row_parse(path, se)
+            after = dcc_compile.read_daily(path, se)
+            assert (before[1] == after[1]).all() and (before[2] == after[2]).all()
+
+            print ("  %2i-minute readings (%i rows):" %(interval, len(before[1])))
+            for name, func in (("per-row", row_parse), ("two-phase", dcc_compile.read_daily)):
+                best = min(timeit.repeat(lambda: func(path, se), number=1, repeat=repeat))
+                print ("    %-10s %9.3f ms" %(name, best * 1000))
+    finally:
+        shutil.rmtree(saveDir)
+
+
+def row_shp(inputcsv, outputshp):
+    """csv_to_shp before the bulk writer: a row lookup and a print per feature."""
+
+    import shapefile
+    import pandas as pd
+
+    w = shapefile.Writer(shapefile.POINT)
+    w.autoBalance = 1
+    df = pd.read_csv(inputcsv)
+    headers = list(df)
+    for h in headers[2:6]:
+        w.field(h, "C", 40)
+    for h in headers[6:]:
+        w.field(h, "F")
+
+    for n in range(len(df)):
+        w.point(df.loc[n]['Longitude'], df.loc[n]['Latitude'])
+        w.record(*[df.loc[n][h] for h in headers[2:]])
+        print ("Feature %i added to Shapefile" %(n+1))
+
+    w.save(outputshp)
+
+
+def make_table(path, points):
+    """Writes a PART 02 csv of points random locations."""
+
+    rand = np.random.RandomState(points)
+    with open(path, 'w') as outfile:
+        outfile.write("Longitude,Latitude,Region,Province,Location,Sensor_Name,%s\n"
+                      %",".join(dcc_compile.MONTHS))
+        for n in range(points):
+            outfile.write("%.4f,%.4f,REGION %i,PROVINCE %i,LOCATION %i,SENSOR_%i,%s\n"
+                          %(rand.uniform(117, 126), rand.uniform(5, 19), n % 17, n % 81, n, n,
+                            ",".join("%.4f" %v for v in rand.uniform(3000, 7000, 12))))
+
+
+def bench_shapefile(sizes=(10000, 100000), rowLimit=10000, chunksize=10000):
+    """
+    Times converting PART 02 csv's of the given numbers of points with
+    dcc_convert.csv_to_shp, in memory and streamed in chunks, and, up to
+    rowLimit points, with the previous per-row conversion. The outputs
+    are checked to be the same.
+    """
+
+    saveDir = tempfile.mkdtemp()
+    stdout = sys.stdout
+    try:
+        for points in sizes:
+            inputcsv = os.path.join(saveDir, "table.csv")
+            make_table(inputcsv, points)
+            runs = [("bulk", dcc_convert.csv_to_shp),
+                    ("streamed", lambda i, o: dcc_convert.csv_to_shp(i, o, chunksize=chunksize))]
+            if points <= rowLimit:
+                runs.insert(0, ("per-row", row_shp))
+
+            print ("%i points:" %points)
+            for name, func in runs:
+                outputshp = os.path.join(saveDir, name + ".shp")
+                sys.stdout = open(os.devnull, 'w')
+                try:
+                    start = timeit.default_timer()
+                    func(inputcsv, outputshp)
+                    seconds = timeit.default_timer() - start
+                finally:
+                    sys.stdout.close()
+                    sys.stdout = stdout
+                print ("  %-8s %9.3f s" %(name, seconds))
+
+            for name, func in runs[1:]:
+                for suffix in (".shp", ".shx", ".dbf"):
+                    with open(os.path.join(saveDir, runs[0][0] + suffix), 'rb') as before:
+                        with open(os.path.join(saveDir, name + suffix), 'rb') as after:
+                            assert before.read() == after.read(), name + suffix
+    finally:
+        shutil.rmtree(saveDir)
+
+
+def bench_startup(repeat=5):
+    """
+    Times starting a fresh interpreter that imports each of the Tool's
+    entry modules (and the modules they load on first use, for
+    comparison), the best of repeat runs, less the time of a bare
+    interpreter.
+    """
+
+    here = os.path.dirname(os.path.abspath(__file__))
+    runs = [("python", "pass"),
+            ("dcc_gui", "import dcc_gui"),
+            ("dcc_cli", "import dcc_cli; dcc_cli.make_parser()"),
+            ("dcc_download", "import dcc_download"),
+            ("dcc_compile", "import dcc_compile"),
+            ("dcc_convert", "import dcc_convert")]
+
+    with open(os.devnull, 'w') as devnull:
+        bare = None
+        for name, code in runs:
+            times = []
+            for n in range(repeat):
+                start = timeit.default_timer()
+                subprocess.check_call([sys.executable, "-c", code], cwd=here,
+                                      stdout=devnull, stderr=devnull)
+                times.append(timeit.default_timer() - start)
+            if bare is None:
+                bare = min(times)
+                print ("%-14s %7.1f ms" %(name, bare * 1000))
+            else:
+                print ("%-14s %+7.1f ms" %(name, (min(times) - bare) * 1000))
+
+
+BENCHMARKS = {'listing': bench_listing,
+              'download': bench_download,
+              'parse': bench_parse,
+              'shapefile': bench_shapefile,
+              'startup': bench_startup}
+
+
+def main(args):
+
+    names = args or sorted(BENCHMARKS)
+    for name in names:
+        if name not in BENCHMARKS:
+            print ("Unknown benchmark %s. Choose from: %s"
+                   %(name, ", ".join(sorted(BENCHMARKS))))
+            return 1
+        BENCHMARKS[name]()
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
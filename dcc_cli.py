@@ -0,0 +1,370 @@
+#! /usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+ASTI SOLAR RADIATION DATA DOWNLOAD, COMPILE, AND CONVERT TOOL
+-------
+A Collection of Python scripts that downloads daily measurements from
+weather measurment stations (WMS) from the Philippine E-Science Grid
+repository <http://repo.pscigrid.gov.ph/predict>, compiles and averages
+them to monthly average values, and saves the result into a shapefile.
+
+NB:
+The Tool has only been tested for *buntu (Linux) and Python 2.7.x
+The requirements/modules are found in the included requirements.txt
+The Tool is provided under the GNU General Public License v3.0
+
+Copyright (C) 2016 Ben Hur S. Pintor (bhs.pintor@gmail.com)
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <http://www.gnu.org/licenses/>.
+-------
+
+INSTRUCTIONS FOR RUNNING
+1. Open terminal (CTRL+ALT+T in Ubuntu).
+2. Go to asti-solar-dcc-tool directory.
+3. Type python dcc.py
+
+N.B.
+Make sure that the modules found in requirements.txt are installed/present
+in the computer.
+If not, try installing them by typing on your terminal:
+    pip install -r requirements.text
+
+"""
+
+'''
+dcc_cli.py
+runs the Tool's download, compile and convert steps from the command line
+'''
+
+__author__ = "Ben Hur S. Pintor"
+__contact__ = "bhs.pintor<at>gmail.com"
+__version__ = "0.0.1"
+
+import argparse
+import os
+import sys
+from contextlib import contextmanager
+from datetime import date, datetime, timedelta
+
+sys.dont_write_bytecode = True
+
+# the modules of each step are imported by its run_ function, so a
+# subcommand (or --help) only loads the dependencies it needs
+
+SENSOR_COLUMNS = {'BSWM_LUFFT': 7, 'FIELD': 8}
+
+
+@contextmanager
+def quiet(enabled):
+    """Silences the per-file messages of a step."""
+
+    if not enabled:
+        yield
+        return
+
+    stdout = sys.stdout
+    sys.stdout = open(os.devnull, 'w')
+    try:
+        yield
+    finally:
+        sys.stdout.close()
+        sys.stdout = stdout
+
+
+def parse_date(text):
+
+    return datetime.strptime(text, "%Y-%m-%d").date()
+
+
+def download_dates(opts):
+    """The (start, end) of a download from --last, --start/--end or --year/--month/--day."""
+
+    import dcc_download
+
+    if opts.last:
+        end = date.today() - timedelta(1)
+        return end - timedelta(opts.last - 1), end
+
+    if opts.start:
+        return opts.start, opts.end or opts.start
+
+    return dcc_download.input_range({'year': opts.year, 'month': opts.month,
+                                     'day': opts.day})
+
+
+def download_options(opts):
+    """The (start, end), proxies and sensor keywords of a download."""
+
+    import dcc_download
+
+    dates = download_dates(opts)
+    if dates is None:
+        raise ValueError("give --year (--month, --day), --start/--end or --last")
+
+    proxies = {"http": opts.proxy} if opts.proxy else None
+    sensors = dcc_download.input_sensors({'sensor': opts.sensor})
+    if opts.repository:
+        dcc_download.ASTI_URL = opts.repository.rstrip('/')
+    if opts.workers is None:
+        opts.workers = dcc_download.WORKERS
+    if opts.max_in_flight is None:
+        opts.max_in_flight = dcc_download.MAX_IN_FLIGHT
+
+    return dates, proxies, sensors
+
+
+def quality_config(opts):
+    """The QualityConfig of --hours and --midday-share (the defaults if not given)."""
+
+    import dcc_qc
+
+    settings = {}
+    if opts.hours is not None:
+        settings['hours'] = opts.hours
+    if opts.midday_share is not None:
+        settings['midDayShare'] = opts.midday_share
+
+    return dcc_qc.QualityConfig(**settings)
+
+
+def run_download(opts):
+
+    import dcc_download
+
+    dates, proxies, sensors = download_options(opts)
+    stats = dcc_download.DownloadStats()
+
+    cwd = os.getcwd()
+    os.chdir(opts.save_dir)
+    try:
+        with quiet(opts.quiet):
+            dcc_download.download_range(dates[0], dates[1], sensors, proxies,
+                                        opts.workers, opts.max_in_flight,
+                                        engine=opts.engine, compress=opts.compress,
+                                        stats=stats)
+    finally:
+        os.chdir(cwd)
+
+    print (stats.report())
+    return 1 if stats.failed else 0
+
+
+def run_compile(opts):
+
+    import dcc_compile
+
+    config = quality_config(opts)
+    cache = dcc_compile.CompileCache(opts.cache) if opts.cache else None
+    workers = opts.workers if opts.workers is not None else dcc_compile.WORKERS
+
+    with quiet(opts.quiet):
+        dcc_compile.compile_data(opts.directory, 'a', opts.savefile,
+                                 SENSOR_COLUMNS[opts.type], workers=workers,
+                                 cache=cache, config=config)
+
+    print ("Compiled %s to %s" %(opts.directory, opts.savefile))
+    return 0
+
+
+def run_compile2(opts):
+
+    import dcc_compile
+
+    dcc_compile.compile_to_csv(opts.inputcsv, opts.outputcsv, chunksize=opts.chunksize)
+
+    print ("Compiled %s to %s" %(opts.inputcsv, opts.outputcsv))
+    return 0
+
+
+def run_convert(opts):
+
+    import dcc_convert
+
+    chunksize = opts.chunksize if opts.chunksize is not None else dcc_convert.CHUNK_ROWS
+
+    with quiet(opts.quiet):
+        dcc_convert.csv_to_shp(opts.inputcsv, opts.outputshp, chunksize=chunksize)
+
+    print ("Converted %s to %s" %(opts.inputcsv, opts.outputshp))
+    return 0
+
+
+def run_ingest(opts):
+
+    if opts.series:
+        import dcc_series
+        ingest = dcc_series.ingest_series
+    else:
+        import dcc_ingest
+        ingest = dcc_ingest.ingest_data
+
+    with quiet(opts.quiet):
+        ingest(opts.directory, opts.store)
+
+    print ("Ingested %s into %s" %(opts.directory, opts.store))
+    return 0
+
+
+def run_compile_store(opts):
+
+    config = quality_config(opts)
+    se = SENSOR_COLUMNS[opts.type]
+
+    if opts.series:
+        import dcc_series
+        workers = opts.workers if opts.workers is not None else 1
+        with quiet(opts.quiet):
+            dcc_series.compile_series(opts.store, opts.savefile, se, opts.start, opts.end,
+                                      workers, config)
+
+    else:
+        import dcc_ingest
+        if opts.start or opts.end:
+            raise ValueError("--start/--end need --series")
+        with quiet(opts.quiet):
+            dcc_ingest.compile_store(opts.store, opts.savefile, se, config)
+
+    print ("Compiled %s to %s" %(opts.store, opts.savefile))
+    return 0
+
+
+def run_pipeline(opts):
+
+    import dcc_download
+    import dcc_pipeline
+
+    dates, proxies, sensors = download_options(opts)
+    stats = dcc_download.DownloadStats()
+
+    with quiet(opts.quiet):
+        dcc_pipeline.run_pipeline(dates[0], dates[1], sensors, SENSOR_COLUMNS[opts.type],
+                                  opts.outputshp, opts.savefile, proxies, opts.workers,
+                                  opts.max_in_flight, quality_config(opts), stats=stats)
+
+    print (stats.report())
+    print ("Converted to %s" %opts.outputshp)
+    return 1 if stats.failed else 0
+
+
+def add_download_arguments(parser):
+
+    parser.add_argument('--year', default='')
+    parser.add_argument('--month', default='')
+    parser.add_argument('--day', default='')
+    parser.add_argument('--start', type=parse_date, help="first day, YYYY-MM-DD")
+    parser.add_argument('--end', type=parse_date, help="last day, YYYY-MM-DD")
+    parser.add_argument('--last', type=int, default=0,
+                        help="the last N days up to yesterday (for nightly jobs)")
+    parser.add_argument('--sensor', default='',
+                        help="comma-separated sensor keywords (default: all)")
+    parser.add_argument('--proxy', help="http proxy, host:port")
+    parser.add_argument('--workers', type=int)
+    parser.add_argument('--max-in-flight', type=int)
+    parser.add_argument('--repository',
+                        help="URL of the predict repository (or a mirror)")
+
+
+def add_quality_arguments(parser):
+
+    parser.add_argument('--type', choices=sorted(SENSOR_COLUMNS), default='BSWM_LUFFT')
+    parser.add_argument('--hours', type=float,
+                        help="daytime hours of readings a good day needs")
+    parser.add_argument('--midday-share', type=float,
+                        help="share of midday readings a short day needs")
+
+
+def make_parser():
+
+    argparser = argparse.ArgumentParser(
+        description="Download, compile and convert ASTI solar radiation data "
+                    "without the GUI.")
+    argparser.add_argument('-q', '--quiet', action='store_true',
+                           help="only print a summary of each step")
+    commands = argparser.add_subparsers(dest='command')
+    commands.required = True
+
+    download = commands.add_parser('download', help="download daily measurements")
+    add_download_arguments(download)
+    download.add_argument('--save-dir', default='.')
+    download.add_argument('--engine', choices=['threads', 'async'], default='threads')
+    download.add_argument('--compress', choices=['gz', 'zst'])
+    download.set_defaults(run=run_download)
+
+    compile1 = commands.add_parser('compile', help="PART 01: monthly average per sensor per year")
+    compile1.add_argument('directory', help="directory of daily measurements")
+    compile1.add_argument('savefile', help="csv to save/merge the monthly averages into")
+    compile1.add_argument('--workers', type=int)
+    compile1.add_argument('--cache', help="per-file result cache (default: in the directory)")
+    add_quality_arguments(compile1)
+    compile1.set_defaults(run=run_compile)
+
+    compile2 = commands.add_parser('compile2', help="PART 02: monthly average per sensor")
+    compile2.add_argument('inputcsv')
+    compile2.add_argument('outputcsv')
+    compile2.add_argument('--chunksize', type=int, help="rows to read at a time")
+    compile2.set_defaults(run=run_compile2)
+
+    convert = commands.add_parser('convert', help="convert a PART 02 csv to a shapefile")
+    convert.add_argument('inputcsv')
+    convert.add_argument('outputshp')
+    convert.add_argument('--chunksize', type=int, help="rows to write at a time")
+    convert.set_defaults(run=run_convert)
+
+    ingest = commands.add_parser('ingest', help="add daily measurements to a store")
+    ingest.add_argument('directory', help="directory of daily measurements")
+    ingest.add_argument('store', help="store directory (created if missing)")
+    ingest.add_argument('--series', action='store_true',
+                        help="append to per-sensor series files instead of a .npz store")
+    ingest.set_defaults(run=run_ingest)
+
+    compileStore = commands.add_parser('compile-store',
+                                       help="PART 01 from a store instead of daily files")
+    compileStore.add_argument('store', help="store directory")
+    compileStore.add_argument('savefile', help="csv to save/merge the monthly averages into")
+    compileStore.add_argument('--series', action='store_true',
+                              help="the store holds series files (see ingest --series)")
+    compileStore.add_argument('--start', type=parse_date,
+                              help="first day, YYYY-MM-DD (series only)")
+    compileStore.add_argument('--end', type=parse_date,
+                              help="last day, YYYY-MM-DD (series only)")
+    compileStore.add_argument('--workers', type=int, help="processes (series only)")
+    add_quality_arguments(compileStore)
+    compileStore.set_defaults(run=run_compile_store)
+
+    pipeline = commands.add_parser('pipeline', help="download, compile and convert in one pass, "
+                                                    "without intermediate files")
+    pipeline.add_argument('outputshp')
+    add_download_arguments(pipeline)
+    add_quality_arguments(pipeline)
+    pipeline.add_argument('--savefile', help="csv to also save/merge the monthly averages into")
+    pipeline.set_defaults(run=run_pipeline)
+
+    return argparser
+
+
+def main(args):
+
+    argparser = make_parser()
+    opts = argparser.parse_args(args)
+
+    try:
+        return opts.run(opts)
+    except (IOError, OSError, ValueError) as e:
+        print ("ERROR: %s" %e)
+        return 1
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
@@ -55,149 +55,355 @@ __version__ = "0.0.1"
 import os
 import sys
 import csv
+import json
 import numpy as np
 import pandas as pd
-from dateutil import parser
-from datetime import datetime, timedelta
+from functools import partial
 from itertools import groupby
-from operator import itemgetter
+from multiprocessing import Pool, cpu_count
+
+import dcc_qc
+import dcc_store
 
 sys.dont_write_bytecode = True
 
+WORKERS = cpu_count()    # processes for compiling sensors in parallel
 
-def compile_data(directory, saveMode, savePath, se):
+COMPILE_CACHE = ".dcc_compile_cache.json"
 
-    flist = os.listdir(directory)   # get list of files
-    sortedFiles = sorted(flist)     # sort list of files alphabetically
+DATA_HEADER = 'dateTimeRead(YYYY-MM-DD HH-mm-ss)'
 
-    groupedIter = groupby(sortedFiles, key=itemgetter(slice(None,-13)))     # readings grouped by name
+SAVE_HEADER = 'region,province,location,posx,posy,elevation,sensor_name,year,month,solar radiation average (daily),days\n'
 
-    groupedList = [list(f[1]) for f in groupedIter]     # nested list of readings grouped by sensor
+def day_entry(day):
+    """The compile results of a dcc_qc.check_days row, as a dict."""
 
+    return {'good': bool(day['good']), 'sum': float(day['sum']), 'total': int(day['total']),
+            'midDay': int(day['midDay']), 'interval': int(day['interval'])}
+
+
+def daily_stats(times, readings, config=dcc_qc.DEFAULT):
+    """
+    Checks the quality of the readings of a daily file (datetime64 times,
+    float values) as one day. Returns a dict of the quality flag, the day's
+    sum of readings scaled to hourly values, the window reading counts and
+    the interval in minutes.
+    """
+
+    times = times.astype('datetime64[s]').astype(np.int64)
+
+    return day_entry(dcc_qc.check_days(times, readings, [0], config)[0])
+
+
+class CompileCache(object):
+    """
+    A record of the per-day results of the daily files compiled in a
+    directory, keyed by file name and checked against the size and mtime
+    of the file, the column compiled and the quality check settings.
+    Re-compiling a directory only parses new or changed files.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.entries = {}
+        if os.path.exists(path):
+            try:
+                with open(path) as infile:
+                    self.entries = json.load(infile)
+            except ValueError:
+                pass    # unreadable cache, start over
+
+    def get(self, name, stat, se, config=dcc_qc.DEFAULT):
+        entry = self.entries.get(name)
+        if (entry and entry['size'] == stat.st_size and entry['mtime'] == stat.st_mtime and
+                entry['se'] == se and entry.get('qc') == config.key()):
+            return entry
+        return None
+
+    def update(self, name, stat, se, entry, config=dcc_qc.DEFAULT):
+        entry.update(size=stat.st_size, mtime=stat.st_mtime, se=se, qc=config.key())
+        self.entries[name] = entry
+
+    def save(self):
+        temp = self.path + ".tmp"
+        with open(temp, 'w') as outfile:
+            json.dump(self.entries, outfile, indent=0, sort_keys=True)
+        dcc_store.replace_file(temp, self.path)
+
+
+def read_headers(infile):
+    """
+    Reads the station header block of an open daily file ("key: value"
+    lines) up to and including the column names line.
+    """
+
+    headers = {}
+
+    for line in infile:
+        if line.startswith(DATA_HEADER):
+            break
+
+        row = next(csv.reader([line]))
+        if 0 < len(row) < 3:            # heading lines < 3 rows
+            key, value = row[0].split(':')[:2]
+            headers[key] = value[1:]
+
+    return headers
+
+
+def read_readings(infile, se):
+    """
+    Reads the rest (the data block) of an open daily file. Returns the
+    reading times (datetime64) and the float values of column se, without
+    the missing ('None') readings.
+    """
+
+    rows = [line.rstrip('\r\n').split(',') for line in infile]
+    rows = [row for row in rows if len(row) > 3 and row[se] != 'None']
+
+    times = np.array([row[0] for row in rows], dtype='datetime64[s]')
+    readings = np.array([row[se] for row in rows], dtype=float)
+
+    return times, readings
+
+
+def read_daily(path, se):
+    """Reads the headers, then the readings of column se of a daily file."""
+
+    with dcc_store.open_daily(path) as infile:
+        headers = read_headers(infile)
+        times, readings = read_readings(infile, se)
+
+    return headers, times, readings
 
-    if os.path.exists(savePath):
-        o = open(savePath, 'a')
 
+def compile_day(directory, se, config, f):
+    """
+    Reads a daily file and checks the quality of its readings of column
+    se. Returns the file's station headers with the daily_stats results.
+    """
+
+    with dcc_store.open_daily(os.path.join(directory, f)) as infile:
+        return check_day(infile, dcc_store.daily_name(f), se, config)
+
+
+def check_day(infile, name, se, config=dcc_qc.DEFAULT):
+    """
+    Checks the quality of the readings of column se of a daily file read
+    from infile (an open file or an iterator of its lines) named name.
+    """
+
+    headers = read_headers(infile)
+    times, readings = read_readings(infile, se)
+    headers['year'] = str(name[-12:-8])
+    headers['month'] = str(name[-8:-6])
+    headers['day'] = str(name[-6:-4])
+
+    if len(times) > 2:
+        entry = daily_stats(times, readings, config)
     else:
-        o = open(savePath, 'w')
-        o.write('region,province,location,posx,posy,elevation,sensor_name,year,month,solar radiation average (daily),days\n')
+        entry = {'good': False, 'sum': None, 'total': 0, 'midDay': 0, 'interval': None}
+
+    entry['headers'] = headers
+
+    return entry
+
+
+def sensor_line(entries):
+    """
+    The line of the save file of a sensor (monthly average of its good
+    quality days) from the compile_day results of its files, or None.
+    """
+
+    dailyAves = [e['sum'] for e in entries if e['good']]
+    headers = entries[-1]['headers']
+
+    if len(dailyAves) > 0:
+        monthlyAve = np.mean(np.array(dailyAves))
+        return "%s,%s,%s,%s,%s,%s,%s,%s,%s,%.4f,%i\n" %(headers['region'], headers['province'],
+                                                       headers['location'], headers['posx'],
+                                                       headers['posy'], headers['elevation'],
+                                                       headers['sensor_name'], headers['year'],
+                                                       headers['month'], monthlyAve, len(dailyAves))
+
+
+def line_key(line):
+    """The (sensor_name, year, month) of a line of the save file."""
+
+    front, year, month = line.rsplit(',', 4)[:3]
 
-    dailyAves = []
+    return front.rsplit(',', 1)[-1], year, month
 
-    '''Set the time ranges.'''
-    lowerTime = datetime.now().replace(hour=5, minute=0, second=0).time()
-    upperTime = datetime.now().replace(hour=19, minute=0, second=0).time()
-    lowerMidTime = datetime.now().replace(hour=9, minute=0, second=0).time()
-    upperMidTime = datetime.now().replace(hour=15, minute=0, second=0).time()
 
+def merge_lines(savePath, lines):
+    """
+    Writes lines to the save file, replacing the lines of the same sensor
+    and month in place and appending the rest.
+    """
 
-    for group in groupedList:
+    if os.path.exists(savePath):
+        with open(savePath) as infile:
+            saved = infile.readlines()
 
-        for f in group:
-            headers = {}
+    else:
+        saved = [SAVE_HEADER]
 
-            with open(os.path.join(directory, f)) as csvfile:
-                reader = csv.reader(csvfile, delimiter=",")
-                totalReadings = 0
-                midDayReadings = 0
-                noneReadings = 0
-                readings = []
-                times = []
-                goodQuality = False
+    index = dict((line_key(line), n) for n, line in enumerate(saved) if n > 0)
 
-                for row in reader:
-                    if len(row) < 3:            # heading lines < 3 rows
-                        headers[row[0].split(':')[0]] = row[0].split(':')[1][1:]
+    for line in lines:
+        key = line_key(line)
+        if key in index:
+            saved[index[key]] = line
+        else:
+            index[key] = len(saved)
+            saved.append(line)
 
-                    headers['year'] = str(f[-12:-8])
-                    headers['month'] = str(f[-8:-6])
-                    headers['day'] = str(f[-6:-4])
+    temp = savePath + ".tmp"
+    with open(temp, 'w') as o:
+        o.writelines(saved)
+    dcc_store.replace_file(temp, savePath)
 
-                    if len(row) > 3 and row[0] != 'dateTimeRead(YYYY-MM-DD HH-mm-ss)':
 
-                        readingTime = parser.parse(row[0])
+def compile_data(directory, saveMode, savePath, se, workers=1, cache=None,
+                 config=dcc_qc.DEFAULT, progress=None):
+    """
+    Compiles the daily files in directory to monthly averages per sensor
+    and writes them to savePath, replacing the lines of sensors and months
+    already in it. Per-day results are kept in a CompileCache (by default
+    COMPILE_CACHE in directory) so only new or changed files are parsed;
+    with workers > 1 they are parsed on a pool of processes. config holds
+    the thresholds of the quality check (see dcc_qc.QualityConfig).
+    progress(done, total) is called as the files are parsed; an exception
+    it raises stops the compile.
+    """
 
-                        if row[se] != 'None':
-                            readings.append(float(row[se]))
-                            times.append(readingTime)
+    sortedFiles = dcc_store.daily_files(directory)  # daily csv's (plain or compressed), sorted
 
-                            if readingTime.time() >= lowerTime and readingTime.time() <= upperTime:
-                                totalReadings += 1
+    groupedIter = groupby(sortedFiles, key=lambda f: dcc_store.daily_name(f)[:-13])    # readings grouped by name
 
-                            if readingTime.time() >= lowerMidTime and readingTime.time() <= upperMidTime:
-                                midDayReadings += 1
-                
-                if len(times) > 2:
-                    timeDiffs = np.ediff1d(np.array(times))
-                    positiveTimeDiffs = timeDiffs[timeDiffs > timedelta(0,61)]
-                    i = int((np.amin(positiveTimeDiffs).seconds + 30)/60.0)
+    groupedList = [list(f[1]) for f in groupedIter]     # nested list of readings grouped by sensor
 
-                    totalThreshold = int(14 * (60.0/i))
-                    midDayThreshold = int(0.8 * (6 * (60.0/i)))
+    if cache is None:
+        cache = CompileCache(os.path.join(directory, COMPILE_CACHE))
+
+    stats = dict((f, os.stat(os.path.join(directory, f))) for f in sortedFiles)
+    entries = dict((f, cache.get(f, stats[f], se, config)) for f in sortedFiles)
+    changed = [f for f in sortedFiles if entries[f] is None]
+
+    compile_file = partial(compile_day, directory, se, config)
+
+    if progress is None:
+        progress = lambda done, total: None
+    progress(0, len(changed))
+
+    if workers > 1 and len(changed) > 1:
+        pool = Pool(min(workers, len(changed)))
+        try:
+            results = pool.imap(compile_file, changed, chunksize=8)
+            for n, (f, entry) in enumerate(zip(changed, results)):
+                entries[f] = entry
+                progress(n + 1, len(changed))
+        except BaseException:
+            pool.terminate()
+            raise
+        else:
+            pool.close()
+        finally:
+            pool.join()
 
+    else:
+        for n, f in enumerate(changed):
+            entries[f] = compile_file(f)
+            progress(n + 1, len(changed))
 
-                    if totalReadings >= totalThreshold:
-                        goodQuality = True
+    for f in changed:
+        cache.update(f, stats[f], se, entries[f], config)
+        if entries[f]['good']:
+            print ("Done with %s" %f)
 
-                    elif totalReadings in range(totalThreshold - int(2 * (60/i)), totalThreshold):
-                        if midDayReadings >= midDayThreshold:
-                            goodQuality = True
+    lines = [sensor_line([entries[f] for f in group]) for group in groupedList]
 
-                        else:
-                            goodQuality = False
+    merge_lines(savePath, [line for line in lines if line is not None])
+    cache.save()
 
-                    else:
-                        goodQuality = False
+    print ("Done with directory %s" %directory)
 
-                    if goodQuality:
-                        dailyAves.append(np.sum(np.array(readings))/(60.0/i))
-                        print "Done with %s" %f
-        
-        if len(dailyAves) > 0:
-            monthlyAve = np.mean(np.array(dailyAves))
-            s = "%s,%s,%s,%s,%s,%s,%s,%s,%s,%.4f,%i\n" %(headers['region'], headers['province'],
-                                                         headers['location'], headers['posx'],
-                                                         headers['posy'], headers['elevation'],
-                                                         headers['sensor_name'], headers['year'],
-                                                         headers['month'], monthlyAve, len(dailyAves))
 
-            o.write(s)
-        del dailyAves[:]
+MONTHS = ['JAN', 'FEB', 'MAR', 'APR', 'MAY', 'JUN', 'JUL', 'AUG', 'SEP', 'OCT', 'NOV', 'DEC']
+STATION_KEYS = ['region', 'province', 'location']
+TABLE_COLUMNS = ['Longitude', 'Latitude', 'Region', 'Province', 'Location', 'Sensor_Name'] + MONTHS
 
-    print "Done with directory %s" %directory
 
-    o.close()
+def location_sums(df):
+    """
+    The sums of average*days and of days per location and month of a
+    frame of compiled monthly averages, and the latlon and sensor name of
+    every location.
+    """
 
+    df = df.assign(weighted=df['solar radiation average (daily)'] * df['days'])
 
-def compile_to_csv(inputcsv, outputcsv):
+    sums = df.groupby(STATION_KEYS + ['month'])[['weighted', 'days']].sum()
 
-    with open(outputcsv, "w") as csvfile:
-        writer = csv.writer(csvfile, delimiter=",")
-        writer.writerow(['Longitude', 'Latitude', 'Region', 'Province', 'Location', 'Sensor_Name', 'JAN', 'FEB', 'MAR', 'APR', 'MAY', 'JUN', 'JUL' , 'AUG', 'SEP', 'OCT', 'NOV', 'DEC'])
+    return sums, location_max(df)
 
-        monthly_aves = []   # list of monthly averages for a sensor/location
 
-        df = pd.read_csv(inputcsv)   # read the csv file of compiled monthly averages
-        grouped_1 = df.groupby(['region', 'province', 'location'])  # group the monthly averages based on sensor/location
-                                                                    # grouping will include monthly readings for each sensor/location
+def location_max(df):
+    """
+    The largest posx, posy and sensor_name of every location in a frame.
+    The names are taken by sorting (an object column max would be
+    aggregated one group at a time).
+    """
 
-        for name1, group1 in grouped_1:
-            del monthly_aves[:]          # make sure the list of monthly averages is empty
-            lat = group1['posx'].max()          # get the posx of the sensor/location (Latitude)
-            lon = group1['posy'].max()          # get the posy of the sensor/location (Longitude)
-            reg = group1['region'].max()        # get the region of the sensor/location
-            pro = group1['province'].max()      # get the province of the sensor/location
-            loc = group1['location'].max()      # get the location of the sensor/location
-            sen = group1['sensor_name'].max()   # get the sensor name of the sensor/location
-            
-            grouped_2 = group1.groupby('month')    # group the readings based on month
+    names = df.sort_values('sensor_name').drop_duplicates(STATION_KEYS, keep='last')
 
-            for name2, group2 in grouped_2:
-                monthly_ave = group2.groupby(group2.index).apply(lambda x: np.average(group2['solar radiation average (daily)'], weights=group2['days'])).max()
-                monthly_aves.append(monthly_ave)
+    return (df.groupby(STATION_KEYS)[['posx', 'posy']].max()
+            .join(names.set_index(STATION_KEYS)['sensor_name']))
 
-            if lat > 0 and lon > 0:     # if there are latlon values, add to shapefile
-                writer.writerow([lon, lat, reg, pro, loc, sen] + monthly_aves)
 
+def compile_to_csv(inputcsv, outputcsv, chunksize=None):
+    """
+    Averages the compiled monthly averages of every sensor/location over
+    the years, weighted by their number of days, into one row per
+    location with a column per month (empty for months without data).
+    Locations without latlon values are left out. With a chunksize the
+    input is read that many rows at a time, keeping only the running sums
+    per location and month in memory.
+    """
+
+    if chunksize is None:
+        sums, stations = location_sums(pd.read_csv(inputcsv))   # read the csv file of compiled monthly averages
+
+    else:
+        sums, stations = None, None
+        for chunk in pd.read_csv(inputcsv, chunksize=chunksize):
+            chunkSums, chunkStations = location_sums(chunk)
+            if sums is None:
+                sums, stations = chunkSums, chunkStations
             else:
-                pass
+                sums = sums.add(chunkSums, fill_value=0)
+                stations = location_max(pd.concat([stations, chunkStations]).reset_index())
+
+    table = location_table(sums, stations)
+    table.to_csv(outputcsv, index=False, columns=TABLE_COLUMNS)
+
+
+def location_table(sums, stations):
+    """
+    The PART 02 table of one row per location with its latlon and the
+    weighted monthly averages, from the results of location_sums.
+    Locations without latlon values are left out.
+    """
+
+    monthly = (sums['weighted'] / sums['days']).unstack('month')
+    monthly = monthly.reindex(columns=range(1, 13))     # NaN for the missing months
+    monthly.columns = MONTHS
+
+    table = stations.join(monthly).reset_index()
+    table = table[(table['posx'] > 0) & (table['posy'] > 0)]    # if there are latlon values, add to shapefile
+
+    table = table.rename(columns={'posy': 'Longitude', 'posx': 'Latitude', 'region': 'Region',
+                                  'province': 'Province', 'location': 'Location',
+                                  'sensor_name': 'Sensor_Name'})
+
+    return table[TABLE_COLUMNS]
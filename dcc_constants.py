@@ -72,6 +72,8 @@ TOOLTIP_FONT = ('Arial', 9)
 WIDTH = 480
 HEIGHT = 480
 
+POLL_MS = 200      # how often the window checks on a running job
+
 # TOOLTIPS
 '''Download'''
 YEAR_TT = ("Enter the YEAR from which\n" +
@@ -85,14 +87,20 @@ SENSOR_TT = ("Keyword for SENSOR to be downloaded.\n" +
     "SENSORS WITH SOLAR RADIATION MEASURMENTS:\n" +
     "\t> BSWM_LUFFT\n" +
     "\t> -FIELD\n\n" + 
-    "Can also be name of location/province (i.e. ALBAY)")
+    "Can also be name of location/province (i.e. ALBAY)\n" +
+    "Separate several keywords with commas (i.e. BSWM_LUFFT, -FIELD)")
 PROXY_TT = ("Enter the proxy server (if any)")
 PORT_TT = ("Enter the proxy port (if any)")
 DLSAVE_TT = ("Select the directory to save the downloaded sensor readings to.")
+STORE_TT = ("Save each daily csv as is, or compressed\n" +
+    "with gzip (csv.gz) or zstd (csv.zst, needs zstandard).\n" +
+    "COMPILE reads all three.")
 
 '''Compile'''
 DLDIR_TT = ("The directory where the daily measurements csv's are located")
-COMPFILE_TT = ("The file to save/append the monthly average values.")
+COMPFILE_TT = ("The file to save/append the monthly average values. " +
+               "Re-compiling a directory replaces its sensors' months " +
+               "in the file and only reads new or changed daily files.")
 SENTYPE_TT = ("The sensor type of the daily measurements to be compiled.")
 
 COMPFILE2_TT = ("The input csv of compiled monthly average" + 
@@ -51,11 +51,15 @@ __author__ = "Ben Hur S. Pintor"
 __contact__ = "bhs.pintor<at>gmail.com"
 __version__ = "0.0.1"
 
+import os
 import sys
+import time
+from struct import pack
 
 sys.dont_write_bytecode = True
 
 import shapefile
+import numpy as np
 import pandas as pd
 
 EPSG4326 = """GEOGCS["WGS 84",
@@ -76,10 +80,190 @@ def make_prj(inputshp, epsg):
     with open(name, "w") as prj:
         prj.write(epsg)
 
-    print ".prj file created"
+    print (".prj file created")
+
+
+CHUNK_ROWS = 10000     # rows per chunk when streaming
+
+'''Fixed-width point records of the .shp and .shx files.'''
+SHP_POINT = np.dtype([('number', '>i4'), ('length', '>i4'), ('shapeType', '<i4'),
+                      ('x', '<f8'), ('y', '<f8')])
+SHX_POINT = np.dtype([('offset', '>i4'), ('length', '>i4')])
+
+
+def table_fields(headers):
+    """The dbf fields of a PART 02 csv: the names as text, the months as numbers."""
+
+    return ([(h, "C", 40, 0) for h in headers[2:6]] +
+            [(h, "F", 50, 0) for h in headers[6:]])
+
+
+def to_bytes(text):
+
+    return text if isinstance(text, bytes) else text.encode('utf-8')
+
+
+class PointWriter(object):
+    """
+    Writes a POINT shapefile (.shp, .shx and .dbf) to disk as points are
+    added, so only the current batch is held in memory. The headers (file
+    lengths, bounding box, record count) are filled in by close(). Records
+    are written the way shapefile.Writer writes them.
+    """
+
+    def __init__(self, target, fields):
+        base = os.path.splitext(target)[0]
+        self.fields = [(name, fieldType.upper(), int(size), decimal)
+                       for name, fieldType, size, decimal in fields]
+        self.count = 0
+        self.bbox = None
+        self.shp = open(base + '.shp', 'wb')
+        self.shx = open(base + '.shx', 'wb')
+        self.dbf = open(base + '.dbf', 'wb')
+        self.write_headers()    # placeholders until close()
+
+    def add(self, lons, lats, records):
+        """Writes points (arrays of lons and lats) and their attribute records."""
+
+        lons = np.asarray(lons, dtype=float)
+        lats = np.asarray(lats, dtype=float)
+        numbers = np.arange(self.count + 1, self.count + len(lons) + 1)
+
+        points = np.zeros(len(lons), dtype=SHP_POINT)
+        points['number'] = numbers
+        points['length'] = (SHP_POINT.itemsize - 8) // 2
+        points['shapeType'] = shapefile.POINT
+        points['x'] = lons
+        points['y'] = lats
+
+        index = np.zeros(len(lons), dtype=SHX_POINT)
+        index['offset'] = (100 + SHP_POINT.itemsize * (numbers - 1)) // 2
+        index['length'] = points['length']
+
+        self.shp.write(points.tobytes())
+        self.shx.write(index.tobytes())
+        self.dbf.write(b''.join(self.dbf_record(record) for record in records))
+
+        if len(lons):
+            box = [lons.min(), lats.min(), lons.max(), lats.max()]
+            if self.bbox is not None:
+                box = [min(box[0], self.bbox[0]), min(box[1], self.bbox[1]),
+                       max(box[2], self.bbox[2]), max(box[3], self.bbox[3])]
+            self.bbox = box
+        self.count += len(lons)
+
+    def dbf_record(self, record):
+        values = [b' ']     # deletion flag
+
+        for (name, fieldType, size, decimal), value in zip(self.fields, record):
+            if fieldType in ("N", "F"):
+                if value is None or value == '' or value != value:
+                    text = "*" * size   # missing (and NaN) values
+                elif not decimal:
+                    text = format(int(value), "d")[:size].rjust(size)
+                else:
+                    text = format(float(value), ".%if" %decimal)[:size].rjust(size)
+            else:
+                text = str(value)[:size].ljust(size)
+            values.append(to_bytes(text))
+
+        return b''.join(values)
+
+    def write_headers(self):
+        bbox = self.bbox or [0, 0, 0, 0]
+        for f, length in ((self.shp, 100 + SHP_POINT.itemsize * self.count),
+                          (self.shx, 100 + SHX_POINT.itemsize * self.count)):
+            f.seek(0)
+            f.write(pack(">6i", 9994, 0, 0, 0, 0, 0) + pack(">i", length // 2) +
+                    pack("<2i", 1000, shapefile.POINT) + pack("<4d", *bbox) +
+                    pack("<4d", 0, 0, 0, 0))
+
+        year, month, day = time.localtime()[:3]
+        self.dbf.seek(0)
+        self.dbf.write(pack('<BBBBLHH20x', 3, year - 1900, month, day, self.count,
+                            len(self.fields) * 32 + 33,
+                            sum(field[2] for field in self.fields) + 1))
+        for name, fieldType, size, decimal in self.fields:
+            name = to_bytes(name).replace(b' ', b'_')[:11].ljust(11, b'\x00')
+            self.dbf.write(pack('<11sc4xBB14x', name, to_bytes(fieldType), size, decimal))
+        self.dbf.write(b'\r')
+
+    def close(self):
+        self.write_headers()
+        for f in (self.shp, self.shx, self.dbf):
+            f.close()
+
+
+def add_points(w, lons, lats, records):
+    """
+    Adds point geometries (arrays of lons and lats) and their attribute
+    records to a shapefile Writer, in one pass and without a pandas
+    lookup per feature.
+    """
+
+    for lon, lat in zip(lons.tolist(), lats.tolist()):
+        w.point(lon, lat)   # Add geometry
+
+    w.records.extend(records)   # Update records
+
+
+def table_records(df):
+    """The rows of a frame as lists, with None (a missing dbf value) for NaN."""
+
+    return df.astype(object).where(pd.notnull(df), None).values.tolist()
+
+
+def stream_csv_to_shp(inputcsv, outputshp, chunksize, progress=None):
+    """
+    Converts a PART 02 csv to a shapefile chunksize rows at a time with a
+    PointWriter, keeping memory flat regardless of the number of rows.
+    progress(rows, None) is called after every chunk.
+    """
+
+    headers = list(pd.read_csv(inputcsv, nrows=0))
+    chunks = pd.read_csv(inputcsv, chunksize=chunksize)
+
+    write_tables(chunks, headers, outputshp, progress)
+
+
+def table_to_shp(table, outputshp, progress=None):
+    """
+    Converts a PART 02 table (the frame compile_to_csv would save) to a
+    shapefile without going through a csv, CHUNK_ROWS rows at a time.
+    """
+
+    chunks = (table[i:i + CHUNK_ROWS] for i in range(0, len(table), CHUNK_ROWS))
+
+    write_tables(chunks, list(table), outputshp, progress)
 
 
-def csv_to_shp(inputcsv, outputshp):
+def write_tables(chunks, headers, outputshp, progress=None):
+    """Writes the frames in chunks, of PART 02 columns headers, to a shapefile."""
+
+    writer = PointWriter(outputshp, table_fields(headers))
+
+    try:
+        for chunk in chunks:
+            writer.add(chunk['Longitude'].values, chunk['Latitude'].values,
+                       table_records(chunk[headers[2:]]))
+            if progress is not None:
+                progress(writer.count, None)
+    finally:
+        writer.close()
+
+    print ("%i features added to Shapefile" %writer.count)
+
+    make_prj(outputshp, EPSG4326)
+
+
+def csv_to_shp(inputcsv, outputshp, chunksize=None, progress=None):
+    """
+    Converts a PART 02 csv to a POINT shapefile. With a chunksize it is
+    streamed to disk (see stream_csv_to_shp) instead of built in memory.
+    """
+
+    if chunksize is not None:
+        return stream_csv_to_shp(inputcsv, outputshp, chunksize, progress)
 
     w = shapefile.Writer(shapefile.POINT)   # Create a POINT shapefile writer
 
@@ -115,33 +299,11 @@ def csv_to_shp(inputcsv, outputshp):
     for h in float_h:
         w.field(h, "F")
 
-    for n in range(len(df)):        # Get the values per row
-        lon = df.loc[n]['Longitude']
-        lat = df.loc[n]['Latitude']
-        reg = df.loc[n]['Region']
-        pro = df.loc[n]['Province']
-        loc = df.loc[n]['Location']
-        sen = df.loc[n]['Sensor_Name']
-        jan = df.loc[n]['JAN']
-        feb = df.loc[n]['FEB']
-        mar = df.loc[n]['MAR']
-        apr = df.loc[n]['APR']
-        may = df.loc[n]['MAY']
-        jun = df.loc[n]['JUN']
-        jul = df.loc[n]['JUL']
-        aug = df.loc[n]['AUG']
-        sep = df.loc[n]['SEP']
-        ocr = df.loc[n]['OCT']
-        nov = df.loc[n]['NOV']
-        dec = df.loc[n]['DEC']
-
-        w.point(lon, lat)   # Add geometry
-
-        w.record(reg, pro, loc, sen, jan, feb, mar, apr, may, jun, jul, aug, sep, ocr, nov, dec)    # Update records
-
-
-        print "Feature %i added to Shapefile" %(n+1)
+    add_points(w, df['Longitude'].values, df['Latitude'].values,
+               table_records(df[string_h + float_h]))
 
     w.save(outputshp)
 
-    make_prj(outputshp, EPSG4326)
\ No newline at end of file
+    print ("%i features added to Shapefile" %len(df))
+
+    make_prj(outputshp, EPSG4326)
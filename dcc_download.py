@@ -51,143 +51,777 @@ __author__ = "Ben Hur S. Pintor"
 __contact__ = "bhs.pintor<at>gmail.com"
 __version__ = "0.0.1"
 
-from bs4 import BeautifulSoup
+from multiprocessing.pool import ThreadPool
 import requests
-import shutil
+from requests.adapters import HTTPAdapter
+from requests.exceptions import ChunkedEncodingError
+from urllib3.exceptions import HTTPError as StreamError
+from urllib3.util.retry import Retry
+import hashlib
+import json
+import os
+import random
 import re
 import sys
-from datetime import datetime
+import threading
+import time
+from calendar import monthrange
+from datetime import date, timedelta
+
+import dcc_store
 
 sys.dont_write_bytecode = True
 
 ASTI_URL = "http://repo.pscigrid.gov.ph/predict"
 
+WORKERS = 8             # threads fetching listings and files
+MAX_IN_FLIGHT = 32      # downloads queued or running at any one time
+
+MANIFEST = ".dcc_manifest.json"     # record of downloads in the save folder
+MANIFEST_INTERVAL = 30              # seconds between snapshots of the manifest
+LISTING_CACHE = os.path.join(os.path.expanduser("~"), ".dcc_listings.json")
+LISTING_TTL = 6 * 60 * 60           # seconds a cached index page stays fresh
+RECENT_DAYS = 2         # directories of the last days are still filling, never cached
+DATE_DIR = re.compile(r"/(\d{4})(?:/(\d{1,2})(?:/(\d{1,2}))?)?/?$")
+
+TIMEOUT = (10, 60)      # seconds to connect, and to wait between bytes read
+RETRIES = 4             # retries of a failed request before giving up
+BACKOFF = 0.5           # seconds before the first retry, doubled for each next
+RETRY_STATUS = (429, 500, 502, 503, 504)
+SLOW = 2.0              # latency, relative to the usual, that means back off
+
+HREF = re.compile(r"""<a\s[^>]*?href\s*=\s*["']?([^"'\s>]*)""", re.IGNORECASE)
+CHUNK_SIZE = 64 * 1024
+
+
+class IncompleteDownload(IOError):
+    """The connection closed before the whole file was received."""
+
+
+class AdaptiveLimit(object):
+    """
+    Caps the number of downloads running at once and adapts the cap to the
+    repository (additive increase, multiplicative decrease): the cap grows
+    by one after a round of successes at normal latency and halves when a
+    download fails or takes SLOW times longer than the running average.
+    """
+
+    def __init__(self, maximum, minimum=1):
+        self.maximum = maximum
+        self.minimum = minimum
+        self.limit = maximum
+        self.running = 0
+        self.average = None     # moving average of download latency
+        self.successes = 0
+        self.cooldown = 0       # completions to wait before backing off again
+        self.cond = threading.Condition()
+
+    def acquire(self):
+        with self.cond:
+            while self.running >= self.limit:
+                self.cond.wait()
+            self.running += 1
+
+    def release(self, latency=None):
+        """Frees a slot, with the latency of the download or None if it failed."""
+        with self.cond:
+            self.running -= 1
+            self.cooldown = max(0, self.cooldown - 1)
+            slow = latency is None or (self.average is not None and
+                                       latency > SLOW * self.average)
+            if latency is not None:
+                self.average = latency if self.average is None else (
+                    0.9 * self.average + 0.1 * latency)
+
+            if slow:
+                if self.cooldown == 0:
+                    self.limit = max(self.minimum, self.limit // 2)
+                    self.cooldown = self.running + 1
+                self.successes = 0
+            else:
+                self.successes += 1
+                if self.successes >= self.limit:
+                    self.limit = min(self.maximum, self.limit + 1)
+                    self.successes = 0
+
+            self.cond.notify_all()
+
+
+class DownloadStats(object):
+    """
+    Running totals of a download: files found, finished and failed, bytes
+    received, and the number and time of the listings at each level of the
+    repository. cancel() stops a download using them: no more directories
+    are listed and queued files are skipped, each counted in skipped.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.cancelled = False
+        self.skipped = 0
+        self.started = time.time()
+        self.found = 0
+        self.finished = 0
+        self.failed = 0
+        self.bytes = 0
+        self.listings = {'year': [0, 0.0], 'month': [0, 0.0], 'day': [0, 0.0]}
+
+    def listed(self, level, seconds, found=0):
+        with self.lock:
+            self.listings[level][0] += 1
+            self.listings[level][1] += seconds
+            self.found += found
+
+    def done(self, nbytes, failed=False):
+        with self.lock:
+            self.finished += 1
+            self.failed += int(failed)
+            self.bytes += nbytes
+
+    def cancel(self):
+        self.cancelled = True
+
+    def stopping(self):
+        """Whether the next listing or file is to be skipped after a cancel."""
+
+        if not self.cancelled:
+            return False
+        with self.lock:
+            self.skipped += 1
+        return True
+
+    def elapsed(self):
+        return time.time() - self.started
+
+    def report(self):
+        """A few lines summing up the download so far."""
+
+        seconds = max(self.elapsed(), 1e-9)
+        lines = ["%i of %i files (%i failed), %.0f bytes in %.2f s"
+                 %(self.finished, self.found, self.failed, self.bytes, seconds),
+                 "%.1f files/s, %.0f bytes/s"
+                 %(self.finished / seconds, self.bytes / seconds)]
+        for level in ('year', 'month', 'day'):
+            count, total = self.listings[level]
+            if count:
+                lines.append("%s listings: %i, %.1f ms each"
+                             %(level, count, 1000.0 * total / count))
+
+        return "\n".join(lines)
+
+
+class DownloadPool(object):
+    """
+    A pool of worker threads for fetching directory listings and files.
+    Submitting blocks once MAX_IN_FLIGHT downloads are pending so a year of
+    files is never queued at once, and an AdaptiveLimit decides how many of
+    the workers may download at the same time so the repository is not
+    flooded. Downloads cut off mid-transfer are retried with backoff.
+    """
+
+    def __init__(self, workers=WORKERS, maxInFlight=MAX_IN_FLIGHT, stats=None):
+        self.pool = ThreadPool(workers)
+        self.slots = threading.BoundedSemaphore(max(workers, maxInFlight))
+        self.limit = AdaptiveLimit(workers)
+        self.stats = stats if stats is not None else DownloadStats()
+        self.errors = []
+
+    def imap(self, func, items):
+        """Runs func over items in the pool, yielding results in order."""
+        return self.pool.imap(func, items)
+
+    def submit(self, func, *args):
+        """Queues func(*args), waiting for a free slot first."""
+        self.slots.acquire()
+        self.pool.apply_async(self._run, (func, args))
+
+    def _run(self, func, args):
+        try:
+            if self.stats.stopping():
+                return
+            self.stats.done(self._attempt(func, args) or 0)
+        except Exception as e:
+            self.errors.append((args, e))
+            self.stats.done(0, failed=True)
+            print ("ERROR: %s: %s" %(args[0], e))
+        finally:
+            self.slots.release()
+
+    def _attempt(self, func, args):
+        for retry in range(RETRIES + 1):
+            self.limit.acquire()
+            began = time.time()
+            try:
+                result = func(*args)
+            except (StreamError, ChunkedEncodingError, IncompleteDownload):
+                self.limit.release(None)
+                if retry == RETRIES:
+                    raise
+                time.sleep(backoff(retry))
+            except Exception:
+                self.limit.release(None)
+                raise
+            else:
+                self.limit.release(time.time() - began)
+                return result
+
+    def join(self):
+        """Waits for every queued download to finish."""
+        self.pool.close()
+        self.pool.join()
+
+
+def backoff(retry):
+    """Seconds to wait before a retry: exponential, with some jitter."""
+
+    return BACKOFF * (2 ** retry) * random.uniform(0.5, 1.5)
+
+
+class Manifest(object):
+    """
+    A record of the files downloaded into the save folder: their size, the
+    ETag/Last-Modified validators sent by the repository, an md5 checksum
+    and whether the download completed. Complete files are revalidated with
+    a conditional request (or skipped outright when revalidate is False) and
+    partial ones are resumed with a Range request. During a download a
+    snapshot is written every saveEvery seconds, outside the lock the
+    workers update it under.
+    """
+
+    def __init__(self, path=MANIFEST, revalidate=True, saveEvery=MANIFEST_INTERVAL):
+        self.path = path
+        self.revalidate = revalidate
+        self.saveEvery = saveEvery
+        self.lock = threading.Lock()
+        self.writeLock = threading.Lock()
+        self.saved = time.time()
+        self.entries = {}
+        if os.path.exists(path):
+            with open(path) as infile:
+                self.entries = json.load(infile)
+
+    def get(self, name):
+        with self.lock:
+            return self.entries.get(name)
+
+    def update(self, name, entry):
+        with self.lock:
+            self.entries[name] = entry
+            due = time.time() - self.saved >= self.saveEvery
+            if due:
+                self.saved = time.time()
+
+        if due and self.writeLock.acquire(False):  # skip it if a snapshot is being written
+            try:
+                self._write()
+            finally:
+                self.writeLock.release()
+
+    def save(self):
+        with self.writeLock:
+            self._write()
+
+    def _write(self):
+        with self.lock:
+            entries = dict(self.entries)
+
+        temp = self.path + ".tmp"
+        with open(temp, 'w') as outfile:
+            json.dump(entries, outfile, indent=0, sort_keys=True)
+        dcc_store.replace_file(temp, self.path)
+
+
+class ListingCache(object):
+    """
+    An on-disk cache of the links parsed from repository index pages, keyed
+    by URL. Overlapping queries (e.g. different sensors for the same month)
+    reuse the listings instead of fetching and parsing the pages again.
+    Entries older than ttl seconds are ignored and dropped on save, and
+    the pages of directories that may still get files (see still_filling)
+    are not cached at all.
+    """
+
+    def __init__(self, path=LISTING_CACHE, ttl=LISTING_TTL):
+        self.path = path
+        self.ttl = ttl
+        self.lock = threading.Lock()
+        self.entries = {}
+        if os.path.exists(path):
+            try:
+                with open(path) as infile:
+                    self.entries = json.load(infile)
+            except ValueError:
+                pass    # unreadable cache, start over
+
+    def get(self, url):
+        if still_filling(url):
+            return None
+        with self.lock:
+            entry = self.entries.get(url)
+        if entry and time.time() - entry[0] < self.ttl:
+            return entry[1]
+        return None
+
+    def put(self, url, links):
+        if still_filling(url):
+            return
+        with self.lock:
+            self.entries[url] = [time.time(), links]
+
+    def save(self):
+        with self.lock:
+            now = time.time()
+            fresh = dict((url, entry) for url, entry in self.entries.items()
+                         if now - entry[0] < self.ttl)
+            with open(self.path, 'w') as outfile:
+                json.dump(fresh, outfile)
+
+
+def still_filling(url, today=None):
+    """
+    Whether an index page is of a year, month or day directory that ends
+    within RECENT_DAYS of today, so files may still be added to it.
+    """
+
+    match = DATE_DIR.search(url)
+    if match is None:
+        return False
+
+    try:
+        end = day_range(*[part for part in match.groups() if part is not None])[1]
+    except ValueError:
+        return False    # not a date directory
+
+    return end >= (today or date.today()) - timedelta(RECENT_DAYS)
+
+
+def file_md5(name):
+
+    md5 = hashlib.md5()
+    with open(name, 'rb') as infile:
+        for chunk in iter(lambda: infile.read(CHUNK_SIZE), b''):
+            md5.update(chunk)
+
+    return md5
+
+
+def extract_links(html):
+    """
+    Scans an index page for the href of every anchor, in page order.
+    A single pre-compiled regex pass; no document tree is built.
+    """
+
+    return [link.replace('&amp;', '&') for link in HREF.findall(html)]
+
+
+def sensor_filter(sensors):
+    """
+    Compiles one or more sensor keywords into a single pattern that matches
+    a link if any keyword does. No keywords match every link.
+    """
+
+    if not isinstance(sensors, (list, tuple)):
+        sensors = [sensors]
+    sensors = [sensor for sensor in sensors if sensor]
+
+    return re.compile("|".join("(?:%s)" %sensor for sensor in sensors))
+
 
 def get_links(r):
 
-    links = list()
-    soup = BeautifulSoup(r.text)
-    for link in soup.find_all('a'):
-        links.append(link.get('href'))
+    return extract_links(r.text)
+
+
+def make_session(proxies=None, poolSize=MAX_IN_FLIGHT):
+    """
+    Creates the HTTP session shared by every listing and file request of a
+    download. Connections are kept alive and pooled, up to poolSize per host,
+    so the worker threads reuse them instead of reconnecting for each file.
+    Failed connections and server errors are retried with backoff.
+    """
+
+    session = requests.Session()
+    retries = Retry(total=RETRIES, backoff_factor=BACKOFF,
+                    status_forcelist=RETRY_STATUS, raise_on_status=False)
+    adapter = HTTPAdapter(pool_connections=4,
+                          pool_maxsize=poolSize,
+                          max_retries=retries)
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    if proxies:
+        session.proxies.update(proxies)
+
+    return session
+
+
+def list_links(url, session, cache=None):
+    """Returns the links of an index page, from the cache while fresh."""
+
+    links = cache.get(url) if cache else None
+    if links is None:
+        r = session.get(url, timeout=TIMEOUT)
+        r.raise_for_status()
+        links = get_links(r)
+        if cache:
+            cache.put(url, links)
 
     return links
 
 
-def save_to_file(url, name, proxies=None):
+def get_dirs(url, session, cache=None):
+    """Lists the entries of an index page, without the parent link."""
 
-    if proxies:
-        r = requests.get(url, stream=True, proxies=proxies)
+    return [link.strip('/') for link in list_links(url, session, cache)[1:]]
+
+
+def request_headers(name, manifest, stored=None):
+    """
+    Works out the headers for fetching a file from its manifest entry:
+    a conditional request for complete files, a Range request for partial
+    ones. Returns (headers, bytes already on disk); headers is None when the
+    file is complete and need not be revalidated. Compressed files (stored
+    under another name) are fetched whole rather than resumed.
+    """
+
+    stored = stored or name
+    headers = {'Accept-Encoding': 'identity'}   # byte ranges of the raw file
+    entry = manifest.get(name) if manifest else None
+    if entry and entry.get('stored', name) != stored:
+        entry = None    # kept with another compression before
+    size = os.path.getsize(stored) if entry and os.path.exists(stored) else -1
+    validator = entry and (entry.get('etag') or entry.get('modified'))
+
+    if entry and entry['complete'] and size == entry.get('disk', entry['size']):
+        if not manifest.revalidate:
+            return None, size
+        if entry.get('etag'):
+            headers['If-None-Match'] = entry['etag']
+        if entry.get('modified'):
+            headers['If-Modified-Since'] = entry['modified']
+
+    elif (entry and not entry['complete'] and stored == name and size > 0
+          and validator and (entry.get('length') is None or size < entry['length'])):
+        headers['Range'] = "bytes=%i-" %size
+        headers['If-Range'] = validator
+
+    return headers, size
+
+
+def whole_file(headers):
+    """The headers of a request without its Range, to fetch the whole file."""
+
+    return dict((key, value) for key, value in headers.items()
+                if key not in ('Range', 'If-Range'))
+
+
+def start_entry(stored, status, size, headers):
+    """
+    Starts the manifest entry of a download, kept in the file stored, from
+    the response status and headers. Returns (file mode, running md5, entry).
+    """
+
+    if status == 206:
+        mode = 'ab'
+        md5 = file_md5(stored)
     else:
-        r = requests.get(url, stream=True)
-    with open(name, 'wb') as outfile:
-        shutil.copyfileobj(r.raw, outfile)
-    del r
-    print "%s: Saved to file" %name
+        mode = 'wb'
+        md5 = hashlib.md5()
+        size = 0
+
+    length = headers.get('Content-Length')
+    entry = {'size': size,
+             'length': size + int(length) if length else None,
+             'etag': headers.get('ETag'),
+             'modified': headers.get('Last-Modified'),
+             'md5': None,
+             'stored': stored,
+             'disk': None,
+             'complete': False}
+
+    return mode, md5, entry
+
+
+def finish_entry(entry, md5):
+
+    entry['md5'] = md5.hexdigest()
+    entry['disk'] = os.path.getsize(entry['stored'])
+    entry['complete'] = entry['length'] in (None, entry['size'])
+
+
+def save_to_file(url, name, session, manifest=None, compress=None):
+    """Downloads a file, returning the number of bytes received."""
+
+    stored = dcc_store.stored_name(name, compress)
+    headers, size = request_headers(name, manifest, stored)
+    if headers is None:
+        return 0
+
+    r = session.get(url, stream=True, headers=headers, timeout=TIMEOUT)
+    if r.status_code == 416 and 'Range' in headers:
+        r.close()   # nothing past the bytes on disk: fetch it whole
+        r = session.get(url, stream=True, headers=whole_file(headers), timeout=TIMEOUT)
+    if r.status_code == 304:
+        r.close()
+        print ("%s: Unchanged" %name)
+        return 0
+    r.raise_for_status()
+
+    mode, md5, entry = start_entry(stored, r.status_code, size, r.headers)
+    offset = entry['size']
+    if manifest:
+        manifest.update(name, dict(entry))
+
+    with dcc_store.open_store(stored, mode) as outfile:
+        for chunk in iter(lambda: r.raw.read(CHUNK_SIZE), b''):
+            outfile.write(chunk)
+            md5.update(chunk)
+            entry['size'] += len(chunk)
+    r.close()   # hand the connection back to the pool
+
+    finish_entry(entry, md5)
+    if manifest:
+        manifest.update(name, entry)
+    if not entry['complete']:
+        raise IncompleteDownload("%s: got %i of %i bytes"
+                                 %(name, entry['size'], entry['length']))
+    print ("%s: Saved to file" %stored)
 
+    return entry['size'] - offset
 
-def scrape_data(url0, start, dataset, proxies):
+
+def fan_out(pool, func, items):
+    """Maps func over items in the pool (or serially without one)."""
+
+    if pool is None:
+        return (func(item) for item in items)
+    return pool.imap(func, items)
+
+
+def scrape_data(url0, start, dataset, session, pool=None, manifest=None,
+                compress=None, fetch=None):
 
     for data in range(start, len(dataset)):
         url = url0 + "/%s" %dataset[data]
-        save_to_file(url, dataset[data], proxies)
+        if fetch is not None:
+            args = (fetch, url, dataset[data])
+        else:
+            args = (save_to_file, url, dataset[data], session, manifest, compress)
+        if pool is None:
+            args[0](*args[1:])
+        else:
+            pool.submit(*args)
 
 
-def scrape_day_asti(y, m, d, proxies):
+def in_range(start, end, y, m, d=None):
+    """Whether a year/month (or year/month/day) directory falls in a range."""
+
+    try:
+        if d is None:
+            return (start.year, start.month) <= (int(y), int(m)) <= (end.year, end.month)
+        return start <= date(int(y), int(m), int(d)) <= end
+    except ValueError:
+        return False    # not a date directory
+
+
+def scrape_range(start, end, sensors, session, pool=None, manifest=None,
+                 cache=None, compress=None, fetch=None):
+    """
+    Scrapes the files of the given sensors (all sensors if none) for every
+    day from start to end. Each year, month and day directory in the range
+    is listed once, in parallel, and every link of a day is matched against
+    all the sensor keywords in a single pass. Files are saved with
+    save_to_file, or handed to fetch(url, name) if one is given.
+    """
+
+    match = sensor_filter(sensors).search
+    stats = pool.stats if pool is not None else DownloadStats()
+
+    def list_year(y):
+        if stats.stopping():
+            return []
+        began = time.time()
+        url = ASTI_URL + "/%s" %y
+        months = [(y, m) for m in get_dirs(url, session, cache)
+                  if in_range(start, end, y, m)]
+        stats.listed('year', time.time() - began)
+        return months
+
+    def list_month(month):
+        if stats.stopping():
+            return []
+        began = time.time()
+        url = ASTI_URL + "/%s/%s" %month
+        days = [month + (d,) for d in get_dirs(url, session, cache)
+                if in_range(start, end, month[0], month[1], d)]
+        stats.listed('month', time.time() - began)
+        return days
+
+    def list_day(day):
+        url = ASTI_URL + "/%s/%s/%s" %day
+        if stats.stopping():
+            return url, []
+        began = time.time()
+        links = list_links(url, session, cache)[1:]
+        files = [link for link in links if match(link)]
+        stats.listed('day', time.time() - began, len(files))
+        return url, files
+
+    months = list()
+    for yearMonths in fan_out(pool, list_year, range(start.year, end.year + 1)):
+        months.extend(yearMonths)
+
+    days = list()
+    for monthDays in fan_out(pool, list_month, months):
+        days.extend(monthDays)
+
+    for url, files in fan_out(pool, list_day, days):
+        scrape_data(url, 0, files, session, pool, manifest, compress, fetch)
+
+
+def day_range(y, m=None, d=None):
+    """The first and last dates of a year, a month or a single day."""
+
+    y = int(y)
+    if m is None:
+        return date(y, 1, 1), date(y, 12, 31)
+    m = int(m)
+    if d is None:
+        return date(y, m, 1), date(y, m, monthrange(y, m)[1])
+    day = date(y, m, int(d))
+    return day, day
+
+
+def scrape_day_asti(y, m, d, session, pool=None, manifest=None,
+                    cache=None):
     """Scrapes data from all the sensors for a specific day."""
 
-    url = ASTI_URL + "/%s/%s/%s" %(y, m, d)
-    r = requests.get(url, proxies=proxies)
-    sensors = get_links(r)
-    scrape_data(url, 1, sensors, proxies)
+    start, end = day_range(y, m, d)
+    scrape_range(start, end, [], session, pool, manifest, cache)
 
 
-def scrape_month_asti(y, m, proxies):
+def scrape_month_asti(y, m, session, pool=None, manifest=None,
+                      cache=None):
     """Scrapes data from all the sensors for a specific month."""
 
-    url = ASTI_URL + "/%s/%s" %(y, m)
-    r = requests.get(url, proxies=proxies)
-    days = get_links(r)
-    for d in range(1, len(days)):
-        scrape_day_asti(y, m, days[d], proxies)
+    start, end = day_range(y, m)
+    scrape_range(start, end, [], session, pool, manifest, cache)
 
 
-def scrape_year_asti(y, proxies):
+def scrape_year_asti(y, session, pool=None, manifest=None,
+                     cache=None):
     """Scrapes data from all the sensors for a specific year."""
 
-    url = ASTI_URL + "/%s" %(y)
-    r = requests.get(url, proxies=proxies)
-    months = get_links(r)
-    for m in range(1, len(months)):
-        scrape_month_asti(y, months[m], proxies)
+    start, end = day_range(y)
+    scrape_range(start, end, [], session, pool, manifest, cache)
 
 
 def get_sensors(r, sensor):
 
-    links = list()
-    soup = BeautifulSoup(r.text)
-    for link in soup.find_all(href=re.compile(sensor)):
-        links.append(link.get('href'))
+    match = sensor_filter(sensor).search
+    return [link for link in get_links(r) if match(link)]
 
-    return links
 
-
-def scrape_day_sensor(y, m, d, sensor, proxies):
+def scrape_day_sensor(y, m, d, sensor, session, pool=None, manifest=None,
+                      cache=None):
     """Scrapes data from all the sensors for a specific day."""
 
-    url = ASTI_URL + "/%s/%s/%s" %(y, m, d)
-    r = requests.get(url, proxies=proxies)
-    sensors = get_sensors(r, sensor)
-    scrape_data(url, 1, sensors, proxies)
+    start, end = day_range(y, m, d)
+    scrape_range(start, end, [sensor], session, pool, manifest, cache)
 
 
-def scrape_month_sensor(y, m, sensor, proxies):
+def scrape_month_sensor(y, m, sensor, session, pool=None, manifest=None,
+                        cache=None):
     """Scrapes data from all the sensors for a specific month."""
 
-    url = ASTI_URL + "/%s/%s" %(y, m)
-    r = requests.get(url, proxies=proxies)
-    days = get_links(r)
-    for d in range(1, len(days)):
-        scrape_day_sensor(y, m, days[d], sensor, proxies)
+    start, end = day_range(y, m)
+    scrape_range(start, end, [sensor], session, pool, manifest, cache)
 
 
-def scrape_year_sensor(y, sensor, proxies):
+def scrape_year_sensor(y, sensor, session, pool=None, manifest=None,
+                       cache=None):
     """Scrapes data from all the sensors for a specific year."""
 
-    url = ASTI_URL + "/%s" %(y)
-    r = requests.get(url, proxies=proxies)
-    months = get_links(r)
-    for m in range(1, len(months)):
-        scrape_month_asti(y, months[m], sensor, proxies)
+    start, end = day_range(y)
+    scrape_range(start, end, [sensor], session, pool, manifest, cache)
 
 
-def download_data(inputs, proxies=None):
+def input_range(inputs):
+    """
+    Turns the year/month/day inputs of the GUI into a (start, end) range,
+    or None if they don't name a year, month or day. Raises ValueError for
+    an invalid date.
+    """
 
     y = inputs['year']
     m = inputs['month']
     d = inputs['day']
-    s = inputs['sensor']
+
+    if y != '' and m != '' and d != '':
+        return day_range(y, m, d)
+    if y != '' and m != '' and d == '':
+        return day_range(y, m)
+    if y != '' and m == '' and d == '':
+        return day_range(y)
+
+    return None
+
+
+def input_sensors(inputs):
+    """Splits the comma-separated sensor keywords of the GUI."""
+
+    return [s.strip() for s in inputs['sensor'].split(',') if s.strip()]
+
+
+def download_range(start, end, sensors, proxies=None, workers=WORKERS,
+                   maxInFlight=MAX_IN_FLIGHT, session=None, manifest=None,
+                   cache=None, engine='threads', compress=None, stats=None):
+    """
+    Downloads the files of the given sensor keywords (all sensors if the
+    list is empty) for every day from start to end, inclusive. With compress
+    ('gz' or 'zst') each file is streamed into a compressed copy instead.
+    Progress is counted in stats (a DownloadStats) if one is given.
+    """
+
+    if engine == 'async':
+        try:
+            import dcc_download_async
+        except (ImportError, SyntaxError):
+            print ("The async engine needs Python 3.5+ and aiohttp.")
+            return
+        dcc_download_async.download_range(start, end, sensors, proxies,
+                                          maxInFlight, manifest, cache,
+                                          compress, stats)
+        return
+
+    if session is None:
+        session = make_session(proxies, maxInFlight)
+    if manifest is None:
+        manifest = Manifest()
+    if cache is None:
+        cache = ListingCache()
+    pool = DownloadPool(workers, maxInFlight, stats)
 
     try:
-        if y != '' and m != '' and d != '':
-            if datetime(int(y), int(m), int(d)):
-                if s == '':
-                    scrape_day_asti(y, m, d, proxies)
-                else:
-                    scrape_day_sensor(y, m, d, s, proxies)
-
-        if y != '' and m != '' and d == '':
-            if datetime(int(y), int(m), 1):
-                if s == '':
-                    scrape_month_asti(y, m, proxies)
-                else:
-                    scrape_month_sensor(y, m, s, proxies)
-
-        if y != '' and m == '' and d == '':
-            if datetime(int(y), 1, 1):
-                if s == '':
-                    scrape_year_asti(y, proxies)
-                else:
-                    scrape_year_sensor(y, s, proxies)
+        scrape_range(start, end, sensors, session, pool, manifest, cache,
+                     compress)
+
+    finally:
+        pool.join()
+        manifest.save()
+        cache.save()
+
 
+def download_data(inputs, proxies=None, workers=WORKERS, maxInFlight=MAX_IN_FLIGHT,
+                  session=None, manifest=None, cache=None, engine='threads',
+                  compress=None, stats=None):
+
+    try:
+        dates = input_range(inputs)
     except ValueError:
-        print "Input Error."
+        print ("Input Error.")
+        return
+
+    if dates is not None:
+        download_range(dates[0], dates[1], input_sensors(inputs), proxies,
+                       workers, maxInFlight, session, manifest, cache, engine,
+                       compress, stats)
@@ -0,0 +1,289 @@
+#! /usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+ASTI SOLAR RADIATION DATA DOWNLOAD, COMPILE, AND CONVERT TOOL
+-------
+A Collection of Python scripts that downloads daily measurements from
+weather measurment stations (WMS) from the Philippine E-Science Grid
+repository <http://repo.pscigrid.gov.ph/predict>, compiles and averages
+them to monthly average values, and saves the result into a shapefile.
+
+NB:
+The Tool has only been tested for *buntu (Linux) and Python 2.7.x
+The requirements/modules are found in the included requirements.txt
+The Tool is provided under the GNU General Public License v3.0
+
+Copyright (C) 2016 Ben Hur S. Pintor (bhs.pintor@gmail.com)
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <http://www.gnu.org/licenses/>.
+-------
+
+INSTRUCTIONS FOR RUNNING
+1. Open terminal (CTRL+ALT+T in Ubuntu).
+2. Go to asti-solar-dcc-tool directory.
+3. Type python dcc.py
+
+N.B.
+Make sure that the modules found in requirements.txt are installed/present
+in the computer.
+If not, try installing them by typing on your terminal:
+    pip install -r requirements.text
+
+"""
+
+'''
+dcc_download_async.py
+asyncio download engine for very large date ranges (Python 3.5+, aiohttp)
+'''
+
+__author__ = "Ben Hur S. Pintor"
+__contact__ = "bhs.pintor<at>gmail.com"
+__version__ = "0.0.1"
+
+import asyncio
+import sys
+import time
+
+import aiohttp
+
+import dcc_download
+import dcc_store
+from dcc_download import CHUNK_SIZE, MAX_IN_FLIGHT, RETRIES, RETRY_STATUS
+
+sys.dont_write_bytecode = True
+
+
+async def retrying(request, *args):
+    """
+    Awaits request(*args), retrying with exponential backoff when the
+    connection fails, times out or the server answers with RETRY_STATUS.
+    """
+
+    for retry in range(RETRIES + 1):
+        try:
+            return await request(*args)
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            status = getattr(e, 'status', None)
+            if retry == RETRIES or (status is not None and status not in RETRY_STATUS):
+                raise
+            await asyncio.sleep(dcc_download.backoff(retry))
+
+
+async def fetch_links(url, session):
+
+    async with session.get(url) as r:
+        r.raise_for_status()
+        return dcc_download.extract_links(await r.text())
+
+
+async def list_links(url, session, cache):
+    """Returns the links of an index page, from the cache while fresh."""
+
+    links = cache.get(url)
+    if links is None:
+        links = await retrying(fetch_links, url, session)
+        cache.put(url, links)
+
+    return links
+
+
+async def get_dirs(url, session, cache):
+
+    return [link.strip('/') for link in (await list_links(url, session, cache))[1:]]
+
+
+async def save_to_file(url, name, session, manifest, compress=None):
+    """Downloads a file, returning the number of bytes received."""
+
+    stored = dcc_store.stored_name(name, compress)
+    headers, size = dcc_download.request_headers(name, manifest, stored)
+    if headers is None:
+        return 0
+
+    async with session.get(url, headers=headers) as r:
+        if not (r.status == 416 and 'Range' in headers):
+            return await save_response(r, name, manifest, stored, size)
+
+    # nothing past the bytes on disk: fetch it whole
+    async with session.get(url, headers=dcc_download.whole_file(headers)) as r:
+        return await save_response(r, name, manifest, stored, size)
+
+
+async def save_response(r, name, manifest, stored, size):
+    """Saves the body of a file's response, returning the number of bytes received."""
+
+    if r.status == 304:
+        print ("%s: Unchanged" %name)
+        return 0
+    r.raise_for_status()
+
+    mode, md5, entry = dcc_download.start_entry(stored, r.status, size, r.headers)
+    offset = entry['size']
+    manifest.update(name, dict(entry))
+
+    with dcc_store.open_store(stored, mode) as outfile:
+        async for chunk in r.content.iter_chunked(CHUNK_SIZE):
+            outfile.write(chunk)
+            md5.update(chunk)
+            entry['size'] += len(chunk)
+
+    dcc_download.finish_entry(entry, md5)
+    manifest.update(name, entry)
+    print ("%s: Saved to file" %stored)
+
+    return entry['size'] - offset
+
+
+async def scrape_range(start, end, sensors, session, manifest, cache, maxInFlight,
+                       compress=None, stats=None):
+    """
+    Walks the year/month/day directories from start to end, listing each
+    once, and downloads the files of the matching sensors. Listings are
+    fetched concurrently; every file download is a task, and a semaphore
+    keeps at most maxInFlight of them alive so a multi-year walk never holds
+    more than that in memory.
+    """
+
+    match = dcc_download.sensor_filter(sensors).search
+    in_range = dcc_download.in_range
+    if stats is None:
+        stats = dcc_download.DownloadStats()
+    slots = asyncio.Semaphore(maxInFlight)
+    tasks = set()
+    errors = []
+
+    async def fetch(url, name):
+        try:
+            if stats.stopping():
+                return
+            stats.done(await retrying(save_to_file, url, name, session,
+                                      manifest, compress))
+        except Exception as e:
+            errors.append((url, e))
+            stats.done(0, failed=True)
+            print ("ERROR: %s: %s" %(url, e))
+        finally:
+            slots.release()
+
+    async def list_year(y):
+        began = time.time()
+        url = dcc_download.ASTI_URL + "/%s" %y
+        months = [(y, m) for m in await get_dirs(url, session, cache)
+                  if in_range(start, end, y, m)]
+        stats.listed('year', time.time() - began)
+        return months
+
+    async def list_month(month):
+        began = time.time()
+        url = dcc_download.ASTI_URL + "/%s/%s" %month
+        days = [month + (d,) for d in await get_dirs(url, session, cache)
+                if in_range(start, end, month[0], month[1], d)]
+        stats.listed('month', time.time() - began)
+        return days
+
+    async def list_day(day):
+        began = time.time()
+        url = dcc_download.ASTI_URL + "/%s/%s/%s" %day
+        links = (await list_links(url, session, cache))[1:]
+        files = [link for link in links if match(link)]
+        stats.listed('day', time.time() - began, len(files))
+        return url, files
+
+    years = range(start.year, end.year + 1)
+    months = sum(await asyncio.gather(*[list_year(y) for y in years]), [])
+    days = sum(await asyncio.gather(*[list_month(m) for m in months]), [])
+
+    for listing in asyncio.as_completed([list_day(day) for day in days]):
+        url0, files = await listing
+        if stats.stopping():
+            break
+        for name in files:
+            await slots.acquire()
+            task = asyncio.ensure_future(fetch(url0 + "/%s" %name, name))
+            tasks.add(task)
+            task.add_done_callback(tasks.discard)
+
+    if tasks:
+        await asyncio.wait(tasks)
+
+    return errors
+
+
+async def download_range_async(start, end, sensors, proxies=None,
+                               maxInFlight=MAX_IN_FLIGHT, manifest=None,
+                               cache=None, compress=None, stats=None):
+    """The asyncio counterpart of dcc_download.download_range."""
+
+    if manifest is None:
+        manifest = dcc_download.Manifest()
+    if cache is None:
+        cache = dcc_download.ListingCache()
+
+    proxy = (proxies or {}).get('http')
+    if proxy and "://" not in proxy:
+        proxy = "http://" + proxy
+
+    connector = aiohttp.TCPConnector(limit=maxInFlight)
+    timeout = aiohttp.ClientTimeout(sock_connect=dcc_download.TIMEOUT[0],
+                                    sock_read=dcc_download.TIMEOUT[1])
+    async with aiohttp.ClientSession(connector=connector, timeout=timeout) as session:
+        if proxy:
+            session = ProxiedSession(session, proxy)
+        try:
+            return await scrape_range(start, end, sensors, session, manifest,
+                                      cache, maxInFlight, compress, stats)
+        finally:
+            manifest.save()
+            cache.save()
+
+
+class ProxiedSession(object):
+    """Sends every request of an aiohttp session through a proxy."""
+
+    def __init__(self, session, proxy):
+        self.session = session
+        self.proxy = proxy
+
+    def get(self, url, **kwargs):
+        return self.session.get(url, proxy=self.proxy, **kwargs)
+
+
+def download_range(start, end, sensors, proxies=None, maxInFlight=MAX_IN_FLIGHT,
+                   manifest=None, cache=None, compress=None, stats=None):
+    """Runs download_range_async to completion on a fresh event loop."""
+
+    loop = asyncio.new_event_loop()
+    try:
+        return loop.run_until_complete(
+            download_range_async(start, end, sensors, proxies, maxInFlight,
+                                 manifest, cache, compress, stats))
+    finally:
+        loop.close()
+
+
+def download_data(inputs, proxies=None, maxInFlight=MAX_IN_FLIGHT,
+                  manifest=None, cache=None, compress=None):
+    """Takes the same inputs as dcc_download.download_data."""
+
+    try:
+        dates = dcc_download.input_range(inputs)
+    except ValueError:
+        print ("Input Error.")
+        return []
+
+    if dates is None:
+        return []
+    return download_range(dates[0], dates[1], dcc_download.input_sensors(inputs),
+                          proxies, maxInFlight, manifest, cache, compress)
@@ -54,6 +54,8 @@ __version__ = "0.0.1"
 
 import os
 import sys
+import threading
+import time
 
 sys.dont_write_bytecode = True
 
@@ -62,6 +64,7 @@ try:
     import ttk
     from Tkconstants import *
     import tkFileDialog as filedialog
+    import Queue as queue
 
 except ImportError:
     '''keep for Python 3 support'''
@@ -69,12 +72,14 @@ except ImportError:
     import tkinter.ttk as ttk
     from tkinter.constants import *
     import tkinter.filedialog as filedialog
+    import queue
     # print ("Tkinter not found. ")
 
 import dcc_constants as con
-import dcc_download
-import dcc_compile
-import dcc_convert
+
+# dcc_download, dcc_compile and dcc_convert (requests, numpy, pandas and
+# shapefile) are imported by each tool on first use, so the window opens
+# without loading them.
 
 
 rb_font = con.RB_FONT
@@ -126,6 +131,166 @@ class ToolTip(object):
             self.top.destroy()
 
 
+class JobCancelled(Exception):
+    """Raised in a job reporting progress after it was cancelled."""
+
+
+class JobStatus(tk.Frame):
+    """
+    A status bar that runs one job at a time on a background thread so the
+    window stays responsive. The job reports progress through a queue that
+    is polled from the Tk loop with after(); CANCEL stops it at its next
+    progress report (downloads through their DownloadStats). A job that
+    finishes without being stopped is reported done.
+    """
+
+    def __init__(self, master=None):
+        tk.Frame.__init__(self, master, relief=RIDGE, borderwidth=2,
+                          width=width-2, padx=1)
+
+        self.statusVar = tk.StringVar()
+        self.statusVar.set("Ready.")
+        self.queue = queue.Queue()
+        self.cancelled = threading.Event()
+        self.thread = None
+        self.buttons = []
+        self.stats = None
+        self.latest = None
+
+        self.statusLabel = tk.Label(self,
+                                    textvariable=self.statusVar,
+                                    anchor=W,
+                                    width=42,
+                                    pady=2,
+                                    padx=1,
+                                    font=label_font)
+        self.statusLabel.grid(row=0, column=0, columnspan=4, sticky=E+W)
+
+        self.cancelBtn = tk.Button(self,
+                                   text="CANCEL",
+                                   command=self.cancel,
+                                   state=DISABLED,
+                                   width=9,
+                                   font=label_font)
+        self.cancelBtn.grid(row=0, column=4, sticky=E+W)
+
+    def start(self, name, func, buttons=(), stats=None, unit="files"):
+        """
+        Runs func(progress) on a background thread. The job calls
+        progress(done, total) as it goes, or counts into stats (a
+        DownloadStats). buttons are disabled until the job ends.
+        """
+
+        if self.thread is not None and self.thread.is_alive():
+            return
+
+        self.name = name
+        self.unit = unit
+        self.buttons = list(buttons)
+        self.stats = stats
+        self.latest = None
+        self.started = time.time()
+        self.cancelled.clear()
+
+        for button in self.buttons:
+            button.config(state=DISABLED)
+        self.cancelBtn.config(state=NORMAL)
+        self.statusVar.set("%s..." %name)
+
+        self.thread = threading.Thread(target=self.run, args=(func,))
+        self.thread.daemon = True
+        self.thread.start()
+        self.after(con.POLL_MS, self.poll)
+
+    def run(self, func):
+        try:
+            func(self.progress)
+            stopped = self.stats is not None and self.stats.skipped > 0
+            result = ('cancelled' if stopped else 'done', None)     # a late cancel changed nothing
+        except JobCancelled:
+            result = ('cancelled', None)
+        except Exception as e:
+            result = ('error', e)
+
+        self.queue.put(result)
+
+    def progress(self, done, total=None, nbytes=None):
+        """Reports progress from the job thread; raises JobCancelled after a cancel."""
+
+        if self.cancelled.is_set():
+            raise JobCancelled()
+        self.queue.put(('progress', (done, total, nbytes)))
+
+    def cancel(self):
+        self.cancelled.set()
+        if self.stats is not None:
+            self.stats.cancel()
+        self.cancelBtn.config(state=DISABLED)
+        self.statusVar.set("%s: cancelling..." %self.name)
+
+    def poll(self):
+        finished = None
+        while True:
+            try:
+                kind, value = self.queue.get_nowait()
+            except queue.Empty:
+                break
+            if kind == 'progress':
+                self.latest = value
+            else:
+                finished = (kind, value)
+
+        if self.stats is not None:
+            self.latest = (self.stats.finished, self.stats.found, self.stats.bytes)
+
+        if finished is None:
+            if self.latest is not None and not self.cancelled.is_set():
+                self.statusVar.set(self.describe(*self.latest))
+            self.after(con.POLL_MS, self.poll)
+            return
+
+        kind, value = finished
+        if kind == 'done':
+            text = "%s: done" %self.name
+            if self.latest is not None:
+                text = self.describe(*self.latest, eta=False) + " - done"
+            text += " in %s" %clock(time.time() - self.started)
+        elif kind == 'cancelled':
+            text = "%s: cancelled." %self.name
+        else:
+            text = "%s: ERROR: %s" %(self.name, value)
+            print ("ERROR: %s" %value)
+
+        self.statusVar.set(text)
+        self.cancelBtn.config(state=DISABLED)
+        for button in self.buttons:
+            button.config(state=NORMAL)
+
+    def describe(self, done, total=None, nbytes=None, eta=True):
+        """A status line: done of total, bytes, and the time left."""
+
+        text = "%s: %i" %(self.name, done)
+        if total:
+            text += " of %i" %total
+        text += " %s" %self.unit
+        if nbytes:
+            text += ", %.1f MB" %(nbytes / 1e6)
+        if eta and total and done:
+            elapsed = time.time() - self.started
+            text += ", ETA %s" %clock(elapsed * (total - done) / done)
+
+        return text
+
+
+def clock(seconds):
+    """Seconds as m:ss (or h:mm:ss)."""
+
+    minutes, seconds = divmod(int(seconds), 60)
+    if minutes >= 60:
+        return "%i:%02i:%02i" %(minutes // 60, minutes % 60, seconds)
+    return "%i:%02i" %(minutes, seconds)
+
+
 class DownloadApp(tk.Frame):
     """A class for the Download Tool GUI"""
 
@@ -136,6 +301,8 @@ class DownloadApp(tk.Frame):
         '''Variables'''
         self.saveDirVar = tk.StringVar()
         self.saveDirVar.set(os.getcwd())
+        self.storeVar = tk.StringVar()
+        self.storeVar.set("csv")
 
         '''Widgets'''
         self.headMast = tk.Label(self,
@@ -285,6 +452,26 @@ class DownloadApp(tk.Frame):
                                      activebackground='yellow')
         self.downloadBtn.grid(row=3, column=0, columnspan=2, sticky=E+W)
 
+        self.storeLabel = tk.Label(self.dlFrame,
+                                   text='Save as',
+                                   relief=GROOVE,
+                                   width=9,
+                                   pady=2,
+                                   padx=2,
+                                   font=label_font)
+        self.storeLabel.grid(row=3, column=2, sticky=E+W)
+        self.storeTT = ToolTip(self.storeLabel,
+                               con.STORE_TT)
+
+        self.storeMenu = tk.OptionMenu(self.dlFrame,
+                                       self.storeVar,
+                                       "csv", "csv.gz", "csv.zst")
+        self.storeMenu.grid(row=3, column=3, columnspan=2, sticky=E+W)
+
+        # STATUS
+        self.status = JobStatus(self)
+        self.status.grid(row=3, column=0, sticky=E+W)
+
 
     def select_save(self):
         save = filedialog.askdirectory(parent=self,
@@ -295,6 +482,8 @@ class DownloadApp(tk.Frame):
             self.saveDirVar.set(save)
 
     def download_sensor(self):
+        import dcc_download
+
         proxy = self.proxyEntry.get().strip()
         port = self.portEntry.get().strip()
         saveDir = self.saveDirVar.get().strip()
@@ -304,15 +493,35 @@ class DownloadApp(tk.Frame):
                   'sensor': self.sensorEntry.get().strip()}
 
         if proxy == "":
-            os.chdir(saveDir)
-            dcc_download.download_data(inputs)
-            print "DONE!"
-        
+            session = dcc_download.make_session()
+
         else:
             PROXIES = {"http": "%s:%s" %(proxy, port)}
-            os.chdir(saveDir)
-            dcc_download.download_data(inputs, PROXIES)
-            print "DONE!"
+            session = dcc_download.make_session(PROXIES)
+
+        compress = {"csv": None, "csv.gz": 'gz', "csv.zst": 'zst'}[self.storeVar.get()]
+
+        stats = dcc_download.DownloadStats()
+
+        def download(progress):
+            try:
+                try:
+                    dates = dcc_download.input_range(inputs)
+                except ValueError as e:
+                    raise ValueError("Input Error: %s" %e)
+                if dates is None:
+                    raise ValueError("Input Error: give a year (and a month, a day)")
+
+                os.chdir(saveDir)
+                dcc_download.download_range(dates[0], dates[1],
+                                            dcc_download.input_sensors(inputs),
+                                            session=session, compress=compress,
+                                            stats=stats)
+            finally:
+                session.close()
+            print ("DONE!")
+
+        self.status.start("Downloading", download, [self.downloadBtn], stats=stats)
 
 
 class CompileApp(tk.Frame):
@@ -486,6 +695,10 @@ class CompileApp(tk.Frame):
                                      activebackground='yellow')
         self.compileBtn2.grid(row=2, column=0, columnspan=4, sticky=E+W)
 
+        # STATUS
+        self.status = JobStatus(self)
+        self.status.grid(row=5, sticky=E+W)
+
 
     def select_dir(self):
         save = filedialog.askdirectory(parent=self,
@@ -535,14 +748,25 @@ class CompileApp(tk.Frame):
         elif opt == "FIELD":
             se = 8
 
-        dcc_compile.compile_data(directory, saveMode, savePath, se)
+        def compile_measurements(progress):
+            import dcc_compile
+            dcc_compile.compile_data(directory, saveMode, savePath, se,
+                                     workers=dcc_compile.WORKERS, progress=progress)
+
+        self.status.start("Compiling", compile_measurements,
+                          [self.compileBtn, self.compileBtn2])
 
     def compile_persensor(self):
 
         inputcsv = self.inputcsvVar.get()
         outputcsv = self.outputcsvVar.get()
 
-        dcc_compile.compile_to_csv(inputcsv, outputcsv)
+        def compile_persensor(progress):
+            import dcc_compile
+            dcc_compile.compile_to_csv(inputcsv, outputcsv)
+
+        self.status.start("Compiling per sensor", compile_persensor,
+                          [self.compileBtn, self.compileBtn2])
 
 
 class ConvertApp(tk.Frame):
@@ -622,6 +846,10 @@ class ConvertApp(tk.Frame):
                                     activebackground='yellow')
         self.convertBtn.grid(row=2, column=0, columnspan=4, sticky=E+W)
 
+        # STATUS
+        self.status = JobStatus(self)
+        self.status.grid(row=2, sticky=E+W)
+
 
     def select_incsv(self):
         save = filedialog.askopenfilename(parent=self,
@@ -647,4 +875,9 @@ class ConvertApp(tk.Frame):
         incsv = self.incsvVar.get()
         outshp = self.outshpVar.get()
 
-        dcc_convert.csv_to_shp(incsv, outshp)
\ No newline at end of file
+        def convert(progress):
+            import dcc_convert
+            dcc_convert.csv_to_shp(incsv, outshp, chunksize=dcc_convert.CHUNK_ROWS,
+                                   progress=progress)
+
+        self.status.start("Converting", convert, [self.convertBtn], unit="rows")
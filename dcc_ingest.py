@@ -0,0 +1,208 @@
+#! /usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+ASTI SOLAR RADIATION DATA DOWNLOAD, COMPILE, AND CONVERT TOOL
+-------
+A Collection of Python scripts that downloads daily measurements from
+weather measurment stations (WMS) from the Philippine E-Science Grid
+repository <http://repo.pscigrid.gov.ph/predict>, compiles and averages
+them to monthly average values, and saves the result into a shapefile.
+
+NB:
+The Tool has only been tested for *buntu (Linux) and Python 2.7.x
+The requirements/modules are found in the included requirements.txt
+The Tool is provided under the GNU General Public License v3.0
+
+Copyright (C) 2016 Ben Hur S. Pintor (bhs.pintor@gmail.com)
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <http://www.gnu.org/licenses/>.
+-------
+
+INSTRUCTIONS FOR RUNNING
+1. Open terminal (CTRL+ALT+T in Ubuntu).
+2. Go to asti-solar-dcc-tool directory.
+3. Type python dcc.py
+
+N.B.
+Make sure that the modules found in requirements.txt are installed/present
+in the computer.
+If not, try installing them by typing on your terminal:
+    pip install -r requirements.text
+
+"""
+
+'''
+dcc_ingest.py
+a columnar store of the readings of downloaded daily measurements
+'''
+
+__author__ = "Ben Hur S. Pintor"
+__contact__ = "bhs.pintor<at>gmail.com"
+__version__ = "0.0.1"
+
+import json
+import os
+import sys
+from itertools import groupby
+
+import numpy as np
+
+import dcc_compile
+import dcc_qc
+import dcc_store
+
+sys.dont_write_bytecode = True
+
+'''The columns kept in the store (solar_radiation and solar_radiation_field).'''
+STORE_COLUMNS = (7, 8)
+SUFFIX = ".npz"
+
+
+def read_columns(path):
+    """
+    Reads a daily file into its headers, the reading times (int64 seconds
+    since the epoch) and a float32 array per STORE_COLUMNS column, with
+    NaN for the missing ('None') readings.
+    """
+
+    with dcc_store.open_daily(path) as infile:
+        headers = dcc_compile.read_headers(infile)
+        rows = [line.rstrip('\r\n').split(',') for line in infile]
+
+    rows = [row for row in rows if len(row) > max(STORE_COLUMNS)]
+    times = np.array([row[0] for row in rows], dtype='datetime64[s]').astype(np.int64)
+    columns = dict((c, np.array([row[c] if row[c] != 'None' else 'nan' for row in rows],
+                                dtype=np.float32)) for c in STORE_COLUMNS)
+
+    return headers, times, columns
+
+
+def sensor_groups(directory):
+    """The daily files in directory, sorted and grouped by sensor name."""
+
+    sortedFiles = dcc_store.daily_files(directory)
+
+    for sensor, files in groupby(sortedFiles, key=lambda f: dcc_store.daily_name(f)[:-13]):
+        yield sensor, list(files)
+
+
+def store_path(storeDir, sensor):
+
+    return os.path.join(storeDir, sensor + SUFFIX)
+
+
+def store_sensors(storeDir):
+    """The names of the sensors in a store, sorted."""
+
+    return sorted(f[:-len(SUFFIX)] for f in os.listdir(storeDir) if f.endswith(SUFFIX))
+
+
+def load_sensor(storeDir, sensor):
+    """
+    Loads the readings of a sensor from a store. Returns its headers, the
+    reading times (int64 seconds) and a dict of the float32 columns.
+    """
+
+    with np.load(store_path(storeDir, sensor)) as data:
+        headers = json.loads(str(data['headers']))
+        times = data['time']
+        columns = dict((c, data['column%i' %c]) for c in STORE_COLUMNS)
+
+    return headers, times, columns
+
+
+def save_sensor(storeDir, sensor, headers, times, columns):
+
+    path = store_path(storeDir, sensor)
+    temp = path + ".tmp"
+    arrays = dict(('column%i' %c, columns[c]) for c in STORE_COLUMNS)
+
+    with open(temp, 'wb') as outfile:
+        np.savez(outfile, headers=np.array(json.dumps(headers, sort_keys=True)),
+                 time=times, **arrays)
+    dcc_store.replace_file(temp, path)
+
+
+def ingest_data(directory, storeDir):
+    """
+    Adds the daily files in directory to the store in storeDir: one .npz
+    per sensor holding its station headers once and its readings sorted by
+    time. Readings already in the store are replaced by the ingested ones.
+    """
+
+    if not os.path.isdir(storeDir):
+        os.makedirs(storeDir)
+
+    for sensor, files in sensor_groups(directory):
+        parts = [read_columns(os.path.join(directory, f)) for f in files]
+        headers = parts[-1][0]
+        times = [p[1] for p in parts]
+        columns = dict((c, [p[2][c] for p in parts]) for c in STORE_COLUMNS)
+
+        if os.path.exists(store_path(storeDir, sensor)):
+            stored = load_sensor(storeDir, sensor)
+            times.append(stored[1])
+            for c in STORE_COLUMNS:
+                columns[c].append(stored[2][c])
+
+        times = np.concatenate(times)
+        times, first = np.unique(times, return_index=True)  # the ingested reading wins
+        columns = dict((c, np.concatenate(columns[c])[first]) for c in STORE_COLUMNS)
+
+        save_sensor(storeDir, sensor, headers, times, columns)
+        print ("Ingested %i files of %s" %(len(parts), sensor))
+
+    print ("Done with directory %s" %directory)
+
+
+def month_lines(headers, times, readings, config=dcc_qc.DEFAULT):
+    """
+    The save file lines (one per month) of a sensor's readings: int64
+    times sorted ascending and float values, NaN where missing. All days
+    are checked at once with dcc_qc.check_days.
+    """
+
+    present = ~np.isnan(readings)
+    times, readings = times[present], np.asarray(readings[present], dtype=float)
+    months = {}
+
+    for day in dcc_qc.check_days(times, readings, config=config):
+        date = np.datetime64(int(day['day']), 'D').astype(object)
+        entry = dcc_compile.day_entry(day)
+        entry['headers'] = dict(headers, year="%04i" %date.year,
+                                month="%02i" %date.month, day="%02i" %date.day)
+        months.setdefault((date.year, date.month), []).append(entry)
+
+    lines = [dcc_compile.sensor_line(months[month]) for month in sorted(months)]
+
+    return [line for line in lines if line is not None]
+
+
+def compile_store(storeDir, savePath, se, config=dcc_qc.DEFAULT):
+    """
+    Compiles the readings of column se of every sensor in the store to
+    monthly averages with the same quality checks as compile_data, one
+    line per sensor and month, merged into savePath.
+    """
+
+    lines = []
+
+    for sensor in store_sensors(storeDir):
+        headers, times, columns = load_sensor(storeDir, sensor)
+        lines.extend(month_lines(headers, times, columns[se], config))
+
+    dcc_compile.merge_lines(savePath, lines)
+
+    print ("Done with store %s" %storeDir)
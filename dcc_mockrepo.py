@@ -0,0 +1,278 @@
+#! /usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+ASTI SOLAR RADIATION DATA DOWNLOAD, COMPILE, AND CONVERT TOOL
+-------
+A Collection of Python scripts that downloads daily measurements from
+weather measurment stations (WMS) from the Philippine E-Science Grid
+repository <http://repo.pscigrid.gov.ph/predict>, compiles and averages
+them to monthly average values, and saves the result into a shapefile.
+
+NB:
+The Tool has only been tested for *buntu (Linux) and Python 2.7.x
+The requirements/modules are found in the included requirements.txt
+The Tool is provided under the GNU General Public License v3.0
+
+Copyright (C) 2016 Ben Hur S. Pintor (bhs.pintor@gmail.com)
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <http://www.gnu.org/licenses/>.
+-------
+
+INSTRUCTIONS FOR RUNNING
+1. Open terminal (CTRL+ALT+T in Ubuntu).
+2. Go to asti-solar-dcc-tool directory.
+3. Type python dcc_mockrepo.py [--port 8000] [--latency 0.05] ...
+
+N.B.
+Make sure that the modules found in requirements.txt are installed/present
+in the computer.
+If not, try installing them by typing on your terminal:
+    pip install -r requirements.text
+
+"""
+
+'''
+dcc_mockrepo.py
+a local stand-in for the predict repository, for tests and benchmarks
+'''
+
+__author__ = "Ben Hur S. Pintor"
+__contact__ = "bhs.pintor<at>gmail.com"
+__version__ = "0.0.1"
+
+import argparse
+import hashlib
+import random
+import sys
+import threading
+import time
+import zlib
+from calendar import monthrange
+
+try:
+    from BaseHTTPServer import BaseHTTPRequestHandler, HTTPServer
+    from SocketServer import ThreadingMixIn
+except ImportError:
+    '''keep for Python 3 support'''
+    from http.server import BaseHTTPRequestHandler, HTTPServer
+    from socketserver import ThreadingMixIn
+
+sys.dont_write_bytecode = True
+
+MODIFIED = "Tue, 01 Mar 2016 00:05:00 GMT"
+COLUMNS = ['dateTimeRead(YYYY-MM-DD HH-mm-ss)', 'rain_value(mm)',
+           'rain_cumulative(mm)', 'air_temperature(C)', 'air_pressure(hPa)',
+           'wind_speed(m/s)', 'wind_direction(deg)', 'solar_radiation(W/m2)',
+           'solar_radiation_field(W/m2)']
+
+
+def make_index(path, names):
+    """Renders a repository index page (nginx autoindex) listing names."""
+
+    rows = ['<a href="%s">%s</a>%s01-Mar-2016 00:05%20i' %(n, n, ' ' * 4, 6793)
+            for n in names]
+    return ('<html>\n<head><title>Index of %s</title></head>\n'
+            '<body bgcolor="white">\n<h1>Index of %s</h1><hr><pre>'
+            '<a href="../">../</a>\n%s\n</pre><hr></body>\n</html>\n'
+            %(path, path, '\n'.join(rows)))
+
+
+def make_daily(sensor, y, m, d, interval=10):
+    """
+    Renders a synthetic daily measurements csv of a sensor: the station
+    header block, then one reading every interval minutes with a clear-sky
+    solar curve and the odd missing ('None') reading.
+    """
+
+    rand = random.Random(zlib.crc32(("%s%i%i%i" %(sensor, y, m, d)).encode("ascii")) & 0xffffffff)
+    station = random.Random(zlib.crc32(sensor.encode("ascii")) & 0xffffffff)
+    lines = ["region: REGION %i" %station.randint(1, 13),
+             "province: PROVINCE %i" %station.randint(1, 80),
+             "location: %s" %sensor.replace('_', ' '),
+             "posx: %.4f" %station.uniform(5.0, 19.0),
+             "posy: %.4f" %station.uniform(117.0, 126.0),
+             "elevation: %i" %station.randint(0, 1500),
+             "sensor_name: %s" %sensor,
+             ",".join(COLUMNS)]
+
+    for minute in range(0, 24 * 60, interval):
+        hour = minute / 60.0
+        solar = max(0.0, 1000.0 * (1 - ((hour - 12) / 6.0) ** 2)) * rand.uniform(0.6, 1.0)
+        value = "None" if rand.random() < 0.01 else "%.2f" %solar
+        lines.append("%04i-%02i-%02i %02i:%02i:00,0.0,0.0,%.1f,%.1f,%.1f,%i,%s,%s"
+                     %(y, m, d, minute // 60, minute % 60, rand.uniform(22, 34),
+                       rand.uniform(1000, 1015), rand.uniform(0, 8),
+                       rand.randint(0, 359), value, value))
+
+    return ("\n".join(lines) + "\n").encode('ascii')
+
+
+class MockRepository(object):
+    """
+    A synthetic year/month/day/sensor tree shaped like the predict
+    repository: every day of the given years and months holds one daily
+    csv per sensor.
+    """
+
+    def __init__(self, years=(2016,), months=range(1, 13), sensors=20,
+                 interval=10, latency=0.0, failRate=0.0):
+        self.years = list(years)
+        self.months = list(months)
+        self.sensors = (["BSWM_LUFFT_%03i" %n for n in range(0, sensors, 2)] +
+                        ["STATION%03i-FIELD" %n for n in range(1, sensors, 2)])
+        self.interval = interval
+        self.latency = latency
+        self.failRate = failRate
+        self.lock = threading.Lock()
+        self.requests = {'year': 0, 'month': 0, 'day': 0, 'file': 0}
+        self.bytes = 0
+
+    def lookup(self, parts):
+        """Returns (level, body) for a path under /predict, or None."""
+
+        try:
+            nums = [int(p) for p in parts[:3]]
+        except ValueError:
+            return None
+        if len(parts) == 0:
+            return 'root', make_index("/predict/", ["%i/" %y for y in self.years])
+        if nums[0] not in self.years:
+            return None
+        y = nums[0]
+        if len(parts) == 1:
+            return 'year', make_index("/predict/%i/" %y,
+                                      ["%02i/" %m for m in self.months])
+        if nums[1] not in self.months:
+            return None
+        m = nums[1]
+        if len(parts) == 2:
+            return 'month', make_index("/predict/%i/%02i/" %(y, m),
+                                       ["%02i/" %d for d in range(1, monthrange(y, m)[1] + 1)])
+        if not 1 <= nums[2] <= monthrange(y, m)[1]:
+            return None
+        d = nums[2]
+        names = ["%s_%i%02i%02i.csv" %(s, y, m, d) for s in self.sensors]
+        if len(parts) == 3:
+            return 'day', make_index("/predict/%i/%02i/%02i/" %(y, m, d), names)
+        if len(parts) == 4 and parts[3] in names:
+            return 'file', make_daily(parts[3][:-13], y, m, d, self.interval)
+        return None
+
+
+class MockHandler(BaseHTTPRequestHandler):
+
+    protocol_version = 'HTTP/1.1'
+    disable_nagle_algorithm = True  # headers and body go out in separate writes
+
+    def do_GET(self):
+        repo = self.server.repo
+        time.sleep(repo.latency)
+
+        parts = [p for p in self.path.split('?')[0].split('/') if p]
+        found = repo.lookup(parts[1:]) if parts[:1] == ['predict'] else None
+        if found is None:
+            return self.reply(404, b'')
+        if random.random() < repo.failRate:
+            return self.reply(503, b'')
+
+        level, body = found
+        if not isinstance(body, bytes):
+            body = body.encode('ascii')
+        if level != 'file':
+            return self.reply(200, body, level, {'Content-Type': 'text/html'})
+
+        etag = '"%s"' %hashlib.md5(body).hexdigest()
+        headers = {'Content-Type': 'text/csv', 'ETag': etag,
+                   'Last-Modified': MODIFIED, 'Accept-Ranges': 'bytes'}
+        if self.headers.get('If-None-Match') == etag:
+            return self.reply(304, None, level, headers)
+
+        ranged = self.headers.get('Range', '')
+        if ranged.startswith('bytes=') and self.headers.get('If-Range') in (etag, MODIFIED, None):
+            start = int(ranged[6:].split('-')[0])
+            headers['Content-Range'] = "bytes %i-%i/%i" %(start, len(body) - 1, len(body))
+            return self.reply(206, body[start:], level, headers)
+
+        return self.reply(200, body, level, headers)
+
+    def reply(self, status, body, level=None, headers=None):
+        repo = self.server.repo
+        with repo.lock:
+            if level in repo.requests:
+                repo.requests[level] += 1
+            repo.bytes += len(body or b'')
+
+        self.send_response(status)
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        if body is not None:
+            self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        if body:
+            self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class MockServer(ThreadingMixIn, HTTPServer):
+
+    daemon_threads = True
+    allow_reuse_address = True
+    request_queue_size = 128    # more than the connections a benchmark opens at once
+
+    def __init__(self, repo, port=0):
+        HTTPServer.__init__(self, ('127.0.0.1', port), MockHandler)
+        self.repo = repo
+        self.url = "http://127.0.0.1:%i/predict" %self.server_address[1]
+
+
+def serve(repo, port=0):
+    """Starts a MockServer for repo on a background thread and returns it."""
+
+    server = MockServer(repo, port)
+    thread = threading.Thread(target=server.serve_forever)
+    thread.daemon = True
+    thread.start()
+
+    return server
+
+
+def main(args):
+
+    argparser = argparse.ArgumentParser(description="Serve a synthetic predict repository.")
+    argparser.add_argument('--port', type=int, default=8000)
+    argparser.add_argument('--years', type=int, nargs='+', default=[2016])
+    argparser.add_argument('--sensors', type=int, default=20)
+    argparser.add_argument('--interval', type=int, default=10,
+                           help="minutes between readings (file size)")
+    argparser.add_argument('--latency', type=float, default=0.0,
+                           help="seconds added to every request")
+    argparser.add_argument('--fail-rate', type=float, default=0.0,
+                           help="fraction of requests answered with 503")
+    opts = argparser.parse_args(args)
+
+    repo = MockRepository(opts.years, sensors=opts.sensors, interval=opts.interval,
+                          latency=opts.latency, failRate=opts.fail_rate)
+    server = MockServer(repo, opts.port)
+    print ("Serving %s" %server.url)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
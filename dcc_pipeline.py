@@ -0,0 +1,180 @@
+#! /usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+ASTI SOLAR RADIATION DATA DOWNLOAD, COMPILE, AND CONVERT TOOL
+-------
+A Collection of Python scripts that downloads daily measurements from
+weather measurment stations (WMS) from the Philippine E-Science Grid
+repository <http://repo.pscigrid.gov.ph/predict>, compiles and averages
+them to monthly average values, and saves the result into a shapefile.
+
+NB:
+The Tool has only been tested for *buntu (Linux) and Python 2.7.x
+The requirements/modules are found in the included requirements.txt
+The Tool is provided under the GNU General Public License v3.0
+
+Copyright (C) 2016 Ben Hur S. Pintor (bhs.pintor@gmail.com)
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <http://www.gnu.org/licenses/>.
+-------
+
+INSTRUCTIONS FOR RUNNING
+1. Open terminal (CTRL+ALT+T in Ubuntu).
+2. Go to asti-solar-dcc-tool directory.
+3. Type python dcc.py
+
+N.B.
+Make sure that the modules found in requirements.txt are installed/present
+in the computer.
+If not, try installing them by typing on your terminal:
+    pip install -r requirements.text
+
+"""
+
+'''
+dcc_pipeline.py
+downloads, compiles and converts in one pass, without intermediate files
+'''
+
+__author__ = "Ben Hur S. Pintor"
+__contact__ = "bhs.pintor<at>gmail.com"
+__version__ = "0.0.1"
+
+import sys
+import threading
+from functools import partial
+
+try:
+    from StringIO import StringIO
+except ImportError:
+    from io import StringIO
+
+sys.dont_write_bytecode = True
+
+import pandas as pd
+
+import dcc_compile
+import dcc_convert
+import dcc_download
+import dcc_qc
+
+
+class MonthCollector(object):
+    """
+    Collects the check_day results of daily files per sensor and month as
+    the files are downloaded. add() is called from the download threads,
+    so a file is compiled as soon as it arrives and only its result is
+    kept.
+    """
+
+    def __init__(self, se, config=dcc_qc.DEFAULT):
+        self.se = se
+        self.config = config
+        self.months = {}
+        self.lock = threading.Lock()
+
+    def add(self, name, body):
+        """Compiles a daily file named name from its downloaded bytes."""
+
+        if not isinstance(body, str):
+            body = body.decode('utf-8')
+        entry = dcc_compile.check_day(iter(body.splitlines(True)), name,
+                                      self.se, self.config)
+
+        with self.lock:
+            self.months.setdefault((name[:-13], name[-12:-6]), []).append((name, entry))
+
+    def lines(self):
+        """
+        The save file lines of the collected sensors and months, in the
+        order compile_data would write them (by file name).
+        """
+
+        lines = []
+        groups = sorted(self.months.values(), key=lambda group: min(name for name, entry in group))
+
+        for group in groups:
+            line = dcc_compile.sensor_line([entry for name, entry in sorted(group, key=lambda n: n[0])])
+            if line is not None:
+                lines.append(line)
+
+        return lines
+
+
+def fetch_day(session, collector, url, name):
+    """Downloads a daily file into memory and compiles it, returning its size."""
+
+    r = session.get(url, stream=True, headers={'Accept-Encoding': 'identity'},
+                    timeout=dcc_download.TIMEOUT)   # the raw bytes are the file
+    r.raise_for_status()
+
+    body = b''.join(iter(lambda: r.raw.read(dcc_download.CHUNK_SIZE), b''))
+    r.close()   # hand the connection back to the pool
+
+    length = r.headers.get('Content-Length')
+    if length and len(body) != int(length):
+        raise dcc_download.IncompleteDownload("%s: got %i of %i bytes"
+                                              %(name, len(body), int(length)))
+
+    collector.add(name, body)
+    print ("%s: Compiled" %name)
+
+    return len(body)
+
+
+def run_pipeline(start, end, sensors, se, outputshp, savePath=None, proxies=None,
+                 workers=dcc_download.WORKERS, maxInFlight=dcc_download.MAX_IN_FLIGHT,
+                 config=dcc_qc.DEFAULT, session=None, cache=None, stats=None):
+    """
+    Downloads the daily files of the given sensor keywords (all sensors if
+    the list is empty) from start to end, compiles the readings of column
+    se and saves the PART 02 table of the result to the shapefile
+    outputshp. Files are compiled in the download threads as they arrive,
+    and nothing but the shapefile is written (and the PART 01 lines,
+    merged into savePath, if one is given). Returns the DownloadStats.
+    """
+
+    if session is None:
+        session = dcc_download.make_session(proxies, maxInFlight)
+    if cache is None:
+        cache = dcc_download.ListingCache()
+    pool = dcc_download.DownloadPool(workers, maxInFlight, stats)
+    collector = MonthCollector(se, config)
+
+    try:
+        dcc_download.scrape_range(start, end, sensors, session, pool, cache=cache,
+                                  fetch=partial(fetch_day, session, collector))
+
+    finally:
+        pool.join()
+        cache.save()
+
+    if pool.stats.skipped:      # a cancel stopped the download
+        return pool.stats
+
+    lines = collector.lines()
+    if savePath is not None:
+        dcc_compile.merge_lines(savePath, lines)
+
+    if len(lines) == 0:
+        print ("No good quality days to convert.")
+        return pool.stats
+
+    df = pd.read_csv(StringIO(dcc_compile.SAVE_HEADER + ''.join(lines)))
+    table = dcc_compile.location_table(*dcc_compile.location_sums(df))
+
+    dcc_convert.table_to_shp(table, outputshp)
+
+    return pool.stats
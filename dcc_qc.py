@@ -0,0 +1,174 @@
+#! /usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+ASTI SOLAR RADIATION DATA DOWNLOAD, COMPILE, AND CONVERT TOOL
+-------
+A Collection of Python scripts that downloads daily measurements from
+weather measurment stations (WMS) from the Philippine E-Science Grid
+repository <http://repo.pscigrid.gov.ph/predict>, compiles and averages
+them to monthly average values, and saves the result into a shapefile.
+
+NB:
+The Tool has only been tested for *buntu (Linux) and Python 2.7.x
+The requirements/modules are found in the included requirements.txt
+The Tool is provided under the GNU General Public License v3.0
+
+Copyright (C) 2016 Ben Hur S. Pintor (bhs.pintor@gmail.com)
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <http://www.gnu.org/licenses/>.
+-------
+
+INSTRUCTIONS FOR RUNNING
+1. Open terminal (CTRL+ALT+T in Ubuntu).
+2. Go to asti-solar-dcc-tool directory.
+3. Type python dcc.py
+
+N.B.
+Make sure that the modules found in requirements.txt are installed/present
+in the computer.
+If not, try installing them by typing on your terminal:
+    pip install -r requirements.text
+
+"""
+
+'''
+dcc_qc.py
+the good-quality check of days of readings, for many days at once
+'''
+
+__author__ = "Ben Hur S. Pintor"
+__contact__ = "bhs.pintor<at>gmail.com"
+__version__ = "0.0.1"
+
+import sys
+
+import numpy as np
+
+sys.dont_write_bytecode = True
+
+'''The result of checking a day of readings.'''
+DAY_DTYPE = np.dtype([('start', '<i8'),             # index of the day's first reading
+                      ('day', '<i8'),               # days since the epoch
+                      ('readings', '<i8'),
+                      ('total', '<i8'),             # readings in the daytime window
+                      ('midDay', '<i8'),            # readings in the midday window
+                      ('interval', '<i8'),          # minutes between readings
+                      ('totalThreshold', '<i8'),
+                      ('midDayThreshold', '<i8'),
+                      ('sum', '<f8'),               # sum of the readings scaled to hourly values
+                      ('good', '?')])
+
+
+class QualityConfig(object):
+    """
+    The thresholds of the good-quality check. A day is good when it has
+    readings for `hours` hours of the daytime window, or when it is short
+    by at most `shortHours` hours but has `midDayShare` of the readings of
+    the `midDayHours` midday hours. Windows are (start, end) hours of the
+    day, excluding the start and including the end.
+    """
+
+    def __init__(self, window=(5, 19), midDayWindow=(9, 15), hours=14,
+                 midDayHours=6, midDayShare=0.8, shortHours=2):
+        self.window = window
+        self.midDayWindow = midDayWindow
+        self.hours = hours
+        self.midDayHours = midDayHours
+        self.midDayShare = midDayShare
+        self.shortHours = shortHours
+
+    def key(self):
+        """The settings as a list, to tell results of different configs apart."""
+
+        return (list(self.window) + list(self.midDayWindow) +
+                [self.hours, self.midDayHours, self.midDayShare, self.shortHours])
+
+
+DEFAULT = QualityConfig()
+
+
+def day_starts(times, labels=None):
+    """
+    The indices where a new day (or a new label, e.g. sensor) starts in
+    int64 times sorted by label, then time.
+    """
+
+    changed = np.diff(times // 86400) != 0
+    if labels is not None:
+        changed |= np.diff(labels) != 0
+
+    return np.concatenate([[0], np.flatnonzero(changed) + 1]).astype(np.int64)
+
+
+def in_window(seconds, window):
+
+    return (seconds > window[0] * 3600) & (seconds <= window[1] * 3600)
+
+
+def check_days(times, values, starts=None, config=DEFAULT):
+    """
+    Checks the quality of the days of readings in int64 times (seconds
+    since the epoch) and float values, split at the indices in starts
+    (by default at every change of calendar day, see day_starts). Returns
+    a DAY_DTYPE array with a row per day. Days of two readings or less
+    are never good.
+    """
+
+    times = np.asarray(times, dtype=np.int64)
+    values = np.asarray(values, dtype=np.float64)
+    if starts is None:
+        starts = day_starts(times)
+    starts = np.asarray(starts, dtype=np.int64)
+
+    result = np.zeros(len(starts) if len(times) else 0, dtype=DAY_DTYPE)
+    if len(result) == 0:
+        return result
+
+    seconds = times % 86400
+    ends = np.append(starts[1:], len(times))
+
+    result['start'] = starts
+    result['day'] = times[starts] // 86400
+    result['readings'] = ends - starts
+    result['total'] = np.add.reduceat(in_window(seconds, config.window).astype(np.int64), starts)
+    result['midDay'] = np.add.reduceat(in_window(seconds, config.midDayWindow).astype(np.int64), starts)
+
+    # the interval is the smallest step over a minute within the day,
+    # 1 minute if there is none
+    none = np.iinfo(np.int64).max
+    steps = np.full(len(times), none, dtype=np.int64)
+    steps[1:] = np.diff(times)
+    steps[starts] = none
+    steps[steps <= 61] = none
+    smallest = np.minimum.reduceat(steps, starts)
+    interval = np.where(smallest == none, 1, (np.minimum(smallest, 86400) + 30) // 60)
+    result['interval'] = interval
+
+    perHour = 60.0 / interval
+    totalThreshold = (config.hours * perHour).astype(np.int64)
+    midDayThreshold = (config.midDayShare * (config.midDayHours * perHour)).astype(np.int64)
+    shortBy = (config.shortHours * (60 // interval)).astype(np.int64)
+    result['totalThreshold'] = totalThreshold
+    result['midDayThreshold'] = midDayThreshold
+
+    sums = np.add.reduceat(values, starts)
+    result['sum'] = sums / perHour
+
+    total = result['total']
+    result['good'] = (result['readings'] > 2) & (
+        (total >= totalThreshold) |
+        ((total >= totalThreshold - shortBy) & (result['midDay'] >= midDayThreshold)))
+
+    return result
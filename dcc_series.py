@@ -0,0 +1,224 @@
+#! /usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+ASTI SOLAR RADIATION DATA DOWNLOAD, COMPILE, AND CONVERT TOOL
+-------
+A Collection of Python scripts that downloads daily measurements from
+weather measurment stations (WMS) from the Philippine E-Science Grid
+repository <http://repo.pscigrid.gov.ph/predict>, compiles and averages
+them to monthly average values, and saves the result into a shapefile.
+
+NB:
+The Tool has only been tested for *buntu (Linux) and Python 2.7.x
+The requirements/modules are found in the included requirements.txt
+The Tool is provided under the GNU General Public License v3.0
+
+Copyright (C) 2016 Ben Hur S. Pintor (bhs.pintor@gmail.com)
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <http://www.gnu.org/licenses/>.
+-------
+
+INSTRUCTIONS FOR RUNNING
+1. Open terminal (CTRL+ALT+T in Ubuntu).
+2. Go to asti-solar-dcc-tool directory.
+3. Type python dcc.py
+
+N.B.
+Make sure that the modules found in requirements.txt are installed/present
+in the computer.
+If not, try installing them by typing on your terminal:
+    pip install -r requirements.text
+
+"""
+
+'''
+dcc_series.py
+append-only per-sensor time-series files, read through memory maps
+'''
+
+__author__ = "Ben Hur S. Pintor"
+__contact__ = "bhs.pintor<at>gmail.com"
+__version__ = "0.0.1"
+
+import json
+import os
+import sys
+from datetime import timedelta
+from functools import partial
+from multiprocessing import Pool
+
+import numpy as np
+
+import dcc_compile
+import dcc_ingest
+import dcc_qc
+import dcc_store
+
+sys.dont_write_bytecode = True
+
+'''A reading: int64 seconds since the epoch and the float32 solar columns.'''
+RECORD = np.dtype([('time', '<i8')] +
+                  [('column%i' %c, '<f4') for c in dcc_ingest.STORE_COLUMNS])
+SUFFIX = ".ts"
+META_SUFFIX = ".json"
+
+
+def epoch(when):
+    """Seconds since the epoch of a date, datetime or datetime64."""
+
+    return np.datetime64(when, 's').astype(np.int64)
+
+
+class SensorSeries(object):
+    """
+    A read-only memory map of a sensor's series file: fixed-width RECORDs
+    sorted by time. Slices by date range are views of the map, so only
+    the pages of the range are read and processes reading the same file
+    share the page cache.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        count = os.path.getsize(path) // RECORD.itemsize    # ignore a torn last record
+        if count:
+            self.records = np.memmap(path, dtype=RECORD, mode='r', shape=(count,))
+        else:
+            self.records = np.zeros(0, dtype=RECORD)
+
+        with open(path[:-len(SUFFIX)] + META_SUFFIX) as infile:
+            self.headers = json.load(infile)
+
+    def __len__(self):
+        return len(self.records)
+
+    @property
+    def times(self):
+        return self.records['time']
+
+    def between(self, start=None, end=None):
+        """The records from start (inclusive) to end (exclusive), as a view."""
+
+        times = self.times
+        lo = np.searchsorted(times, epoch(start)) if start is not None else 0
+        hi = np.searchsorted(times, epoch(end)) if end is not None else len(times)
+
+        return self.records[lo:hi]
+
+
+def series_path(seriesDir, sensor):
+
+    return os.path.join(seriesDir, sensor + SUFFIX)
+
+
+def series_sensors(seriesDir):
+    """The names of the sensors with series files in seriesDir, sorted."""
+
+    return sorted(f[:-len(SUFFIX)] for f in os.listdir(seriesDir) if f.endswith(SUFFIX))
+
+
+def append_series(seriesDir, sensor, headers, times, columns):
+    """
+    Adds readings to a sensor's series file. Readings later than the last
+    one stored are appended; otherwise (a backfill) the file is rewritten
+    merged by time, the new readings replacing stored ones.
+    """
+
+    if len(times) == 0:
+        return
+
+    path = series_path(seriesDir, sensor)
+    records = np.empty(len(times), dtype=RECORD)
+    records['time'] = times
+    for c in dcc_ingest.STORE_COLUMNS:
+        records['column%i' %c] = columns[c]
+    records = records[np.argsort(records['time'], kind='mergesort')]
+
+    stored = SensorSeries(path) if os.path.exists(path) else None
+
+    if stored is None or len(stored) == 0 or records['time'][0] > stored.times[-1]:
+        size = len(stored) * RECORD.itemsize if stored is not None else 0
+        del stored
+        with open(path, 'ab') as outfile:
+            outfile.truncate(size)      # drop a torn last record
+            outfile.write(records.tobytes())
+
+    else:
+        merged = np.concatenate([records, np.array(stored.records)])
+        first = np.unique(merged['time'], return_index=True)[1]
+        del stored
+        temp = path + ".tmp"
+        with open(temp, 'wb') as outfile:
+            outfile.write(merged[first].tobytes())
+        dcc_store.replace_file(temp, path)
+
+    with open(path[:-len(SUFFIX)] + META_SUFFIX, 'w') as outfile:
+        json.dump(headers, outfile, sort_keys=True)
+
+
+def ingest_series(directory, seriesDir):
+    """Appends the daily files in directory to per-sensor series files."""
+
+    if not os.path.isdir(seriesDir):
+        os.makedirs(seriesDir)
+
+    for sensor, files in dcc_ingest.sensor_groups(directory):
+        parts = [dcc_ingest.read_columns(os.path.join(directory, f)) for f in files]
+        columns = dict((c, np.concatenate([p[2][c] for p in parts]))
+                       for c in dcc_ingest.STORE_COLUMNS)
+
+        append_series(seriesDir, sensor, parts[-1][0],
+                      np.concatenate([p[1] for p in parts]), columns)
+        print ("Ingested %i files of %s" %(len(files), sensor))
+
+    print ("Done with directory %s" %directory)
+
+
+def series_lines(seriesDir, se, start, end, config, sensor):
+    """The save file lines of a sensor's readings of column se in a date range."""
+
+    series = SensorSeries(series_path(seriesDir, sensor))
+    records = series.between(start, end)
+
+    return dcc_ingest.month_lines(series.headers, records['time'], records['column%i' %se], config)
+
+
+def compile_series(seriesDir, savePath, se, start=None, end=None, workers=1,
+                   config=dcc_qc.DEFAULT):
+    """
+    Compiles the readings of column se of every sensor in seriesDir from
+    the start to the end date (inclusive, None for all) to monthly averages,
+    merged into savePath. With workers > 1 the sensors are compiled on a
+    pool of processes mapping the same files.
+    """
+
+    if end is not None:
+        end = end + timedelta(1)
+    sensors = series_sensors(seriesDir)
+    compile_sensor = partial(series_lines, seriesDir, se, start, end, config)
+
+    if workers > 1 and len(sensors) > 1:
+        pool = Pool(min(workers, len(sensors)))
+        try:
+            lines = pool.map(compile_sensor, sensors)
+        finally:
+            pool.close()
+            pool.join()
+
+    else:
+        lines = [compile_sensor(sensor) for sensor in sensors]
+
+    dcc_compile.merge_lines(savePath, [line for sensorLines in lines for line in sensorLines])
+
+    print ("Done with series %s" %seriesDir)
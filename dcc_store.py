@@ -0,0 +1,155 @@
+#! /usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+ASTI SOLAR RADIATION DATA DOWNLOAD, COMPILE, AND CONVERT TOOL
+-------
+A Collection of Python scripts that downloads daily measurements from
+weather measurment stations (WMS) from the Philippine E-Science Grid
+repository <http://repo.pscigrid.gov.ph/predict>, compiles and averages
+them to monthly average values, and saves the result into a shapefile.
+
+NB:
+The Tool has only been tested for *buntu (Linux) and Python 2.7.x
+The requirements/modules are found in the included requirements.txt
+The Tool is provided under the GNU General Public License v3.0
+
+Copyright (C) 2016 Ben Hur S. Pintor (bhs.pintor@gmail.com)
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <http://www.gnu.org/licenses/>.
+-------
+
+INSTRUCTIONS FOR RUNNING
+1. Open terminal (CTRL+ALT+T in Ubuntu).
+2. Go to asti-solar-dcc-tool directory.
+3. Type python dcc.py
+
+N.B.
+Make sure that the modules found in requirements.txt are installed/present
+in the computer.
+If not, try installing them by typing on your terminal:
+    pip install -r requirements.text
+
+"""
+
+'''
+dcc_store.py
+reading and writing daily measurement files, plain or compressed
+'''
+
+__author__ = "Ben Hur S. Pintor"
+__contact__ = "bhs.pintor<at>gmail.com"
+__version__ = "0.0.1"
+
+import gzip
+import io
+import os
+import sys
+from contextlib import contextmanager
+
+sys.dont_write_bytecode = True
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None    # zstd storage is optional
+
+SUFFIXES = {None: '', 'gz': '.gz', 'zst': '.zst'}
+
+
+def stored_name(name, compress=None):
+    """The name a downloaded file is stored under with the given compression."""
+
+    if compress not in SUFFIXES:
+        raise ValueError("Unknown compression %s" %compress)
+    if compress == 'zst' and zstandard is None:
+        raise ValueError("zstd storage needs the zstandard module")
+
+    return name + SUFFIXES[compress]
+
+
+def daily_name(stored):
+    """The original name of a stored file (without .gz/.zst)."""
+
+    for suffix in ('.gz', '.zst'):
+        if stored.endswith(suffix):
+            return stored[:-len(suffix)]
+
+    return stored
+
+
+def daily_files(directory):
+    """
+    The stored daily files in directory, sorted by daily_name. A day
+    stored more than once (e.g. as .csv and, from a later download, as
+    .csv.gz) is listed once, by its most recently written file.
+    """
+
+    latest = {}
+    for f in os.listdir(directory):
+        name = daily_name(f)
+        if name.endswith('.csv'):
+            stored = (os.path.getmtime(os.path.join(directory, f)), f)
+            latest[name] = max(latest.get(name, stored), stored)
+
+    return [latest[name][1] for name in sorted(latest)]
+
+
+def replace_file(temp, path):
+    """
+    Moves temp over path in one step, so a crash leaves either the old or
+    the new file. Only Python 2 on Windows, which can't rename over a
+    file, removes path first.
+    """
+
+    if hasattr(os, 'replace'):
+        os.replace(temp, path)
+    else:
+        if os.name == 'nt' and os.path.exists(path):
+            os.remove(path)
+        os.rename(temp, path)
+
+
+@contextmanager
+def open_store(path, mode='wb'):
+    """Opens a file for writing, compressing it by the suffix of its name."""
+
+    with open(path, mode) as outfile:
+        if path.endswith('.gz'):
+            name = os.path.basename(daily_name(path))
+            with gzip.GzipFile(name, mode, fileobj=outfile) as gzfile:
+                yield gzfile
+        elif path.endswith('.zst'):
+            writer = zstandard.ZstdCompressor().stream_writer(outfile)
+            yield writer
+            writer.flush(zstandard.FLUSH_FRAME)
+        else:
+            yield outfile
+
+
+def open_daily(path):
+    """Opens a stored daily file for reading, decompressing it if needed."""
+
+    if path.endswith('.gz'):
+        infile = gzip.open(path, 'rb')
+    elif path.endswith('.zst'):
+        with open(path, 'rb') as compressed:
+            reader = zstandard.ZstdDecompressor().stream_reader(compressed)
+            infile = io.BytesIO(reader.read())
+    else:
+        return open(path)
+
+    if sys.version_info[0] > 2:
+        return io.TextIOWrapper(infile)
+    return infile